@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+# 預設與原本的行為相同，呼叫端可以選擇 lean 或 minimal
+DEFAULT_PROFILE = os.environ.get('SCRAPER_LOAD_PROFILE', 'full')
+
+
+def extension_patterns(*extensions: str) -> List[str]:
+    """Network.setBlockedURLs 的萬用字元比對整個網址，帶查詢字串的網址（foo.png?v=1）需要另外一個樣式"""
+    return [pattern for ext in extensions for pattern in (f'*.{ext}', f'*.{ext}?*')]
+
+
+# 圖片、字型與影音檔案（圖示網址是從 DOM 屬性讀取，不需要實際下載）
+MEDIA_PATTERNS = extension_patterns(
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+    'mp4', 'webm', 'm3u8', 'mp3',
+)
+
+# 追蹤與分析服務
+TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*play.google.com/log*', '*xp.apple.com*',
+    '*securemetrics.apple.com*', '*metrics.apple.com*',
+]
+
+
+class LoadProfile(BaseModel):
+    name: str
+    blocked_urls: List[str] = []
+    page_load_timeout: int = 30
+    script_timeout: int = 30
+    ios_wait_timeout: int = 10
+    android_wait_timeout: int = 20
+    android_scroll_times: int = 3
+    android_scroll_pause: float = 2
+    # 每個頁面的時間預算（秒），超過時會記錄在頁面載入統計中
+    ios_page_budget: float = 30
+    android_page_budget: float = 45
+    # 讀取 Chrome performance log 統計請求數與傳輸量，每個頁面都有額外負擔，預設關閉
+    collect_metrics: bool = False
+
+    def page_budget(self, platform: str) -> float:
+        return self.ios_page_budget if platform == "iOS" else self.android_page_budget
+
+
+LOAD_PROFILES: Dict[str, LoadProfile] = {
+    # 不封鎖任何資源也不收集 performance log，與原本的行為相同
+    "full": LoadProfile(name="full"),
+    # 封鎖圖片、字型、影音與追蹤器，保留腳本與樣式以確保版本資訊視窗可以正常開啟
+    "lean": LoadProfile(
+        name="lean",
+        blocked_urls=MEDIA_PATTERNS + TRACKER_PATTERNS,
+        page_load_timeout=20,
+        android_wait_timeout=15,
+        android_scroll_pause=1,
+        ios_page_budget=20,
+        android_page_budget=30,
+        collect_metrics=True,
+    ),
+    # 再封鎖樣式表，適合只需要基本欄位的大量爬取
+    "minimal": LoadProfile(
+        name="minimal",
+        blocked_urls=MEDIA_PATTERNS + TRACKER_PATTERNS + extension_patterns('css'),
+        page_load_timeout=15,
+        script_timeout=15,
+        ios_wait_timeout=8,
+        android_wait_timeout=10,
+        android_scroll_times=1,
+        android_scroll_pause=1,
+        ios_page_budget=12,
+        android_page_budget=18,
+        collect_metrics=True,
+    ),
+}
+
+
+def get_load_profile(name: Optional[str] = None) -> LoadProfile:
+    profile_name = name or DEFAULT_PROFILE
+    if profile_name not in LOAD_PROFILES:
+        raise ValueError(f"未知的載入設定檔: {profile_name}，可用設定檔: {', '.join(LOAD_PROFILES)}")
+    return LOAD_PROFILES[profile_name]
+
+
+def summarize_performance_log(entries: List[dict]) -> dict:
+    """從 Chrome performance log 統計請求數、傳輸量與被封鎖的請求"""
+    requests = 0
+    blocked = 0
+    bytes_transferred = 0
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            requests += 1
+        elif method == "Network.loadingFinished":
+            bytes_transferred += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked += 1
+    return {
+        "requests": requests,
+        "blocked_requests": blocked,
+        "bytes_transferred": bytes_transferred,
+    }
+
+
+class PageLoadStats:
+    """依設定檔與平台累計頁面載入時間與傳輸量"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, dict]] = {}
+
+    def record(self, profile: str, platform: str, elapsed: float, metrics: dict, over_budget: bool):
+        with self._lock:
+            stats = self._stats.setdefault(profile, {}).setdefault(platform, {
+                "pages": 0,
+                "over_budget": 0,
+                "total_seconds": 0.0,
+                "requests": 0,
+                "blocked_requests": 0,
+                "bytes_transferred": 0,
+            })
+            stats["pages"] += 1
+            stats["over_budget"] += int(over_budget)
+            stats["total_seconds"] += elapsed
+            for key in ("requests", "blocked_requests", "bytes_transferred"):
+                stats[key] += metrics.get(key, 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        with self._lock:
+            result = {}
+            for profile, platforms in self._stats.items():
+                result[profile] = {}
+                for platform, stats in platforms.items():
+                    pages = stats["pages"] or 1
+                    result[profile][platform] = {
+                        **stats,
+                        "avg_seconds": stats["total_seconds"] / pages,
+                        "avg_bytes": stats["bytes_transferred"] / pages,
+                    }
+            return result
+
+
+page_load_stats = PageLoadStats()
@@ -0,0 +1,116 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from typing import Any, Optional
+
+LOG_ROTATION = os.environ.get('SCRAPER_LOG_ROTATION', 'size')  # size 或 time
+LOG_MAX_BYTES = int(os.environ.get('SCRAPER_LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('SCRAPER_LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.environ.get('SCRAPER_LOG_ROTATE_WHEN', 'midnight')
+# 每個欄位的擷取日誌只記錄一定比例，警告與錯誤不受影響
+FIELD_LOG_SAMPLE_RATE = float(os.environ.get('SCRAPER_FIELD_LOG_SAMPLE_RATE', 0.1))
+
+FIELD_LOGGER_NAME = 'scraper.fields'
+_STRUCTURED_KEYS = ('platform', 'field', 'value', 'elapsed_ms', 'url')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """每行輸出一筆 JSON，附帶欄位名稱與擷取耗時等結構化資訊"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in _STRUCTURED_KEYS:
+            if key in record.__dict__:
+                entry[key] = record.__dict__[key]
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """放進佇列前只把訊息格式化；traceback 轉成文字留在 exc_text，由各個 handler 自行輸出"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 標準的 prepare 會把 traceback 併入訊息並清除 exc_text，JSON 日誌就拿不到獨立的例外欄位
+        record = copy.copy(record)
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            # traceback 物件會留住請求中的堆疊，不放進佇列
+            record.exc_info = None
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class SampleFilter(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def _create_file_handler(log_file: str) -> logging.Handler:
+    if LOG_ROTATION == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+
+
+def configure_logging(log_file: str, level: int = logging.INFO):
+    """以佇列將日誌交給背景執行緒寫入，請求處理中只需要把紀錄放進佇列"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    file_handler = _create_file_handler(log_file)
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_QueueHandler(log_queue))
+
+    logging.getLogger(FIELD_LOGGER_NAME).addFilter(SampleFilter(FIELD_LOG_SAMPLE_RATE))
+
+
+field_logger = logging.getLogger(FIELD_LOGGER_NAME)
+
+
+def log_field(platform: str, field: str, value: Any, started: float, url: Optional[str] = None):
+    """記錄單一欄位的擷取結果與耗時（依取樣比例輸出）"""
+    if not field_logger.isEnabledFor(logging.INFO):
+        return
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    field_logger.info(
+        "%s 提取 %s: %s (%.2f ms)", platform, field, value, elapsed_ms,
+        extra={"platform": platform, "field": field, "value": value, "elapsed_ms": elapsed_ms, "url": url},
+    )
@@ -1,16 +1,22 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
-from pydantic import BaseModel
+from typing import List, Dict, Optional
+from pydantic import BaseModel, validator
 from scraper import AppScraper, AppInfo
+from load_profiles import LOAD_PROFILES, DEFAULT_PROFILE, get_load_profile, page_load_stats
 import logging
 import asyncio
-from fastapi.responses import JSONResponse
+import json
+import os
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# /scrape/stream 同時開啟的 Chrome 數量
+STREAM_CONCURRENCY = int(os.environ.get('SCRAPER_STREAM_CONCURRENCY', 2))
+
 app = FastAPI(
     title="App Info Scraper API",
     description="一個用於從 App Store 和 Google Play Store 爬取應用程式資訊的 API",
@@ -37,10 +43,19 @@ async def startup_event():
         logger.error(f"Error during startup: {str(e)}")
         raise
 
-class UrlList(BaseModel):
+class ProfileRequest(BaseModel):
+    profile: Optional[str] = None
+
+    @validator("profile")
+    def check_profile(cls, value):
+        if value is not None:
+            get_load_profile(value)
+        return value
+
+class UrlList(ProfileRequest):
     urls: List[str]
 
-class UrlPair(BaseModel):
+class UrlPair(ProfileRequest):
     ios_urls: List[str]
     android_urls: List[str]
 
@@ -52,7 +67,7 @@ async def root():
 async def scrape_ios(urls: UrlList):
     try:
         logger.info(f"開始處理 iOS URLs: {urls.urls}")
-        scraper = AppScraper()
+        scraper = AppScraper(profile=urls.profile)
         results = []
         
         # 使用 semaphore 限制並發數
@@ -94,7 +109,7 @@ async def scrape_ios(urls: UrlList):
 @app.post("/scrape/android")
 async def scrape_android(urls: UrlList):
     try:
-        scraper = AppScraper()
+        scraper = AppScraper(profile=urls.profile)
         results = []
         for url in urls.urls:
             try:
@@ -113,7 +128,7 @@ async def scrape_android(urls: UrlList):
 @app.post("/scrape/all")
 async def scrape_all(urls: UrlPair):
     try:
-        scraper = AppScraper()
+        scraper = AppScraper(profile=urls.profile)
         ios_results = []
         android_results = []
         ios_categories = {}
@@ -134,11 +149,13 @@ async def scrape_all(urls: UrlPair):
                     "url": url
                 })
 
-        # 再爬取 Android 應用程式
+        # 再爬取 Android 應用程式，全部完成後再一次進行一對一配對
+        android_apps = []
         for url in urls.android_urls:
             try:
-                result = await scraper.scrape_android_app(url, ios_categories)
-                android_results.append(result.to_dict() if isinstance(result, AppInfo) else result)
+                result = await scraper.scrape_android_app(url)
+                android_apps.append(result)
+                android_results.append(result)
             except Exception as e:
                 logger.error(f"處理 Android URL 時出錯: {url}, 錯誤: {str(e)}")
                 android_results.append({
@@ -146,6 +163,12 @@ async def scrape_all(urls: UrlPair):
                     "url": url
                 })
 
+        scraper.match_android_apps(android_apps, ios_categories)
+        android_results = [
+            result.to_dict() if isinstance(result, AppInfo) else result
+            for result in android_results
+        ]
+
         return {
             "ios_results": ios_results,
             "android_results": android_results
@@ -153,6 +176,110 @@ async def scrape_all(urls: UrlPair):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def stream_event(event_type: str, data: dict) -> str:
+    # 與前端分析頁相同的 NDJSON 格式：每行一個 {"type", "data"} 事件
+    return json.dumps({"type": event_type, "data": data}, ensure_ascii=False) + "\n"
+
+async def run_scrape(scrape, *args) -> AppInfo:
+    # scrape_* 內部是同步的 Selenium 呼叫，放到執行緒中執行，讓事件迴圈可以持續送出已完成的結果
+    return await asyncio.to_thread(lambda: asyncio.run(scrape(*args)))
+
+@app.post("/scrape/stream")
+async def scrape_stream(urls: UrlPair):
+    """每個應用程式完成後立即回傳，Android 的類別於全部完成後以 patch 事件補上"""
+    async def generate():
+        try:
+            scrapers = [await asyncio.to_thread(AppScraper, urls.profile)]
+        except Exception as e:
+            logger.error(f"初始化 AppScraper 失敗: {str(e)}")
+            yield stream_event("error", {"error": f"初始化爬蟲失敗: {str(e)}"})
+            return
+
+        # 每個並行的工作使用自己的 Chrome，用完放回 idle 給下一個工作
+        idle = list(scrapers)
+        sem = asyncio.Semaphore(max(1, STREAM_CONCURRENCY))
+
+        async def scrape_job(platform, index, url):
+            async with sem:
+                scraper = idle.pop() if idle else None
+                try:
+                    if scraper is None:
+                        scraper = await asyncio.to_thread(AppScraper, urls.profile)
+                        scrapers.append(scraper)
+                    scrape = scraper.scrape_ios_app if platform == "iOS" else scraper.scrape_android_app
+                    return platform, index, url, await run_scrape(scrape, url), None
+                except Exception as e:
+                    return platform, index, url, None, e
+                finally:
+                    if scraper is not None:
+                        idle.append(scraper)
+
+        jobs = [("iOS", index, url) for index, url in enumerate(urls.ios_urls)]
+        jobs += [("Android", index, url) for index, url in enumerate(urls.android_urls)]
+        tasks = [asyncio.ensure_future(scrape_job(*job)) for job in jobs]
+        ios_categories = {}
+        android_apps = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                platform, index, url, result, error = await next_done
+                if error is not None:
+                    logger.error(f"處理 {platform} URL 時出錯: {url}, 錯誤: {str(error)}")
+                    yield stream_event("error", {
+                        "platform": platform,
+                        "index": index,
+                        "url": url,
+                        "error": f"處理 URL 時出錯: {str(error)}"
+                    })
+                    continue
+                if platform == "iOS":
+                    ios_categories[result.app_name] = result.category
+                else:
+                    android_apps[index] = result
+                yield stream_event("app", {
+                    "platform": platform,
+                    "index": index,
+                    "url": url,
+                    "result": result.to_dict()
+                })
+
+            scrapers[0].match_android_apps(list(android_apps.values()), ios_categories)
+            for index, app_info in android_apps.items():
+                if app_info.ios_similar_app:
+                    yield stream_event("patch", {
+                        "platform": "Android",
+                        "index": index,
+                        "category": app_info.category,
+                        "ios_similar_app": app_info.ios_similar_app,
+                        "similarity": app_info.similarity
+                    })
+
+            yield stream_event("done", {
+                "ios_count": len(urls.ios_urls),
+                "android_count": len(urls.android_urls)
+            })
+        finally:
+            # 用戶端中途斷線時也要停止其餘工作並關閉所有 Chrome
+            for task in tasks:
+                task.cancel()
+            for scraper in scrapers:
+                try:
+                    scraper.close()
+                except Exception as e:
+                    logger.warning(f"關閉 WebDriver 失敗: {str(e)}")
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/profiles")
+async def list_profiles():
+    return {
+        "default": DEFAULT_PROFILE,
+        "profiles": {name: profile.dict() for name, profile in LOAD_PROFILES.items()}
+    }
+
+@app.get("/metrics/page-load")
+async def page_load_metrics():
+    return page_load_stats.snapshot()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "Service is running"}
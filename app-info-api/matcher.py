@@ -0,0 +1,160 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# 與原本 find_most_similar_ios_app 相同的權重與門檻
+FULL_WEIGHT = 0.6
+KEYWORD_WEIGHT = 0.4
+CONTAINS_BONUS = 0.2
+MIN_SIMILARITY = 0.3
+
+NGRAM_SIZES = (2, 3)
+
+_BRACKET_PATTERN = re.compile(r'（.*?）|\(.*?\)')
+_SPACE_PATTERN = re.compile(r'\s+')
+# 英數字詞與連續的中日韓文字分開切分，例如 "ikea台灣" -> ["ikea", "台灣"]
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+
+def normalize_name(name: str) -> str:
+    # 全形轉半形、轉小寫並移除括號內的說明文字
+    name = unicodedata.normalize('NFKC', name).lower()
+    name = _BRACKET_PATTERN.sub('', name)
+    return _SPACE_PATTERN.sub(' ', name).strip()
+
+
+def tokenize_name(normalized: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+def _is_long_token(token: str) -> bool:
+    # 英文關鍵字需大於 3 個字元，中文兩個字即具有辨識度
+    if token.isascii():
+        return len(token) > 3
+    return len(token) >= 2
+
+
+def _char_ngrams(normalized: str) -> Dict[str, int]:
+    padded = f" {normalized} "
+    counts: Dict[str, int] = {}
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            gram = padded[i:i + n]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class AppNameMatcher:
+    """預先計算 iOS 應用名稱的特徵，批次比對 Android 應用名稱"""
+
+    def __init__(self, ios_app_names: Iterable[str]):
+        self.ios_app_names = list(ios_app_names)
+        self.key = tuple(self.ios_app_names)
+        self.ios_normalized = [normalize_name(name) for name in self.ios_app_names]
+
+        # 字元 n-gram 向量（L2 正規化後以矩陣乘法計算 cosine）
+        self._ngram_index: Dict[str, int] = {}
+        ngram_counts = [_char_ngrams(name) for name in self.ios_normalized]
+        for counts in ngram_counts:
+            for gram in counts:
+                self._ngram_index.setdefault(gram, len(self._ngram_index))
+        self._ios_ngrams = np.zeros((len(self.ios_app_names), len(self._ngram_index)), dtype=np.float32)
+        for row, counts in enumerate(ngram_counts):
+            for gram, count in counts.items():
+                self._ios_ngrams[row, self._ngram_index[gram]] = count
+        norms = np.linalg.norm(self._ios_ngrams, axis=1, keepdims=True)
+        self._ios_ngrams /= np.maximum(norms, 1e-12)
+
+        # 關鍵字集合以 0/1 矩陣表示，交集數量即為矩陣乘積
+        self._token_index: Dict[str, int] = {}
+        token_sets = [set(tokenize_name(name)) for name in self.ios_normalized]
+        for tokens in token_sets:
+            for token in tokens:
+                self._token_index.setdefault(token, len(self._token_index))
+        self._ios_tokens = np.zeros((len(self.ios_app_names), len(self._token_index)), dtype=np.float32)
+        for row, tokens in enumerate(token_sets):
+            for token in tokens:
+                self._ios_tokens[row, self._token_index[token]] = 1.0
+        self._ios_token_counts = self._ios_tokens.sum(axis=1)
+
+    def score(self, android_app_names: List[str]) -> np.ndarray:
+        """回傳 len(android_app_names) x len(ios_app_names) 的相似度矩陣"""
+        n_android = len(android_app_names)
+        n_ios = len(self.ios_app_names)
+        if n_android == 0 or n_ios == 0:
+            return np.zeros((n_android, n_ios), dtype=np.float32)
+
+        normalized = [normalize_name(name) for name in android_app_names]
+
+        ngrams = np.zeros((n_android, len(self._ngram_index)), dtype=np.float32)
+        ngram_norms = np.zeros(n_android, dtype=np.float32)
+        for row, name in enumerate(normalized):
+            counts = _char_ngrams(name)
+            ngram_norms[row] = np.sqrt(sum(c * c for c in counts.values()))
+            for gram, count in counts.items():
+                col = self._ngram_index.get(gram)
+                if col is not None:
+                    ngrams[row, col] = count
+        ngrams /= np.maximum(ngram_norms, 1e-12)[:, None]
+        full_similarity = ngrams @ self._ios_ngrams.T
+
+        token_sets = [set(tokenize_name(name)) for name in normalized]
+        tokens = np.zeros((n_android, len(self._token_index)), dtype=np.float32)
+        token_counts = np.zeros(n_android, dtype=np.float32)
+        long_tokens: Dict[str, int] = {}
+        long_rows: List[Tuple[int, int]] = []
+        for row, token_set in enumerate(token_sets):
+            token_counts[row] = len(token_set)
+            for token in token_set:
+                col = self._token_index.get(token)
+                if col is not None:
+                    tokens[row, col] = 1.0
+                if _is_long_token(token):
+                    long_rows.append((row, long_tokens.setdefault(token, len(long_tokens))))
+        matches = tokens @ self._ios_tokens.T
+        keyword_similarity = matches / np.maximum(
+            np.maximum(token_counts[:, None], self._ios_token_counts[None, :]), 1.0
+        )
+
+        # 較長的關鍵字出現在 iOS 名稱中時給予加分（每個唯一關鍵字只比對一次）
+        bonus = np.zeros((n_android, n_ios), dtype=np.float32)
+        if long_tokens:
+            contains = np.array(
+                [[token in ios_name for ios_name in self.ios_normalized] for token in long_tokens],
+                dtype=np.float32,
+            )
+            owners = np.zeros((n_android, len(long_tokens)), dtype=np.float32)
+            rows, cols = zip(*long_rows)
+            owners[list(rows), list(cols)] = 1.0
+            bonus = ((owners @ contains) > 0).astype(np.float32) * CONTAINS_BONUS
+
+        return full_similarity * FULL_WEIGHT + keyword_similarity * KEYWORD_WEIGHT + bonus
+
+    def best_match(self, android_app_name: str) -> Tuple[Optional[str], float]:
+        scores = self.score([android_app_name])
+        if scores.size == 0:
+            return None, 0
+        col = int(scores[0].argmax())
+        similarity = float(scores[0, col])
+        if similarity <= MIN_SIMILARITY:
+            return None, 0
+        return self.ios_app_names[col], similarity
+
+    def assign(self, android_app_names: List[str]) -> List[Tuple[Optional[str], float]]:
+        """一對一配對：每個 iOS 應用最多只會對應到一個 Android 應用"""
+        results: List[Tuple[Optional[str], float]] = [(None, 0)] * len(android_app_names)
+        scores = self.score(android_app_names)
+        if scores.size == 0:
+            return results
+
+        # 低於門檻的配對不參與指派，避免影響其他應用的最佳配對
+        candidates = np.where(scores > MIN_SIMILARITY, scores, 0)
+        rows, cols = linear_sum_assignment(candidates, maximize=True)
+        for row, col in zip(rows, cols):
+            similarity = float(scores[row, col])
+            if similarity > MIN_SIMILARITY:
+                results[row] = (self.ios_app_names[col], similarity)
+        return results
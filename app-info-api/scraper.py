@@ -10,10 +10,13 @@ import pandas as pd
 import re
 import time
 from difflib import SequenceMatcher
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from pydantic import BaseModel
+from matcher import AppNameMatcher
+from load_profiles import LoadProfile, get_load_profile, summarize_performance_log, page_load_stats
 import os
 import logging
+from log_config import configure_logging, log_field
 
 # 動態設置日誌路徑
 if os.environ.get('CHROME_BIN'):
@@ -26,18 +29,45 @@ else:
     log_dir = os.path.dirname(os.path.abspath(__file__))
     log_file = os.path.join(log_dir, 'scraper.log')
 
-# 配置日誌，指定編碼為 UTF-8
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(log_file, encoding='utf-8')
-    ]
-)
+# 日誌經由佇列交給背景執行緒寫入可輪替的 JSON 檔案
+configure_logging(log_file)
 logger = logging.getLogger(__name__)
 logger.info(f"日誌文件路徑: {log_file}")
 
+_IOS_NAME_SUFFIX_PATTERN = re.compile(r'\s+\d+\+$')
+_IOS_CATEGORY_PATTERN = re.compile(r'「(.+?)」')
+_IOS_RATING_PATTERN = re.compile(r'([\d.]+)\s*[•·]\s*([\d,.萬万]+)')
+_ANDROID_RATING_PATTERN = re.compile(r'(\d+\.?\d*)')
+_COUNT_TEXT_PATTERN = re.compile(r'[\d,.萬万]+')
+_COUNT_STRIP_PATTERN = re.compile(r'[^\d,.萬万]')
+
+def clean_ios_app_name(text: str) -> str:
+    # 移除名稱後方的年齡分級，例如 "LINE 4+"
+    return _IOS_NAME_SUFFIX_PATTERN.sub('', text.strip())
+
+def parse_ios_category(text: str) -> Optional[str]:
+    category_match = _IOS_CATEGORY_PATTERN.search(text)
+    return category_match.group(1) if category_match else None
+
+def parse_count(text: str) -> int:
+    # 支援繁體「萬」與簡體「万」的數量單位
+    text = _COUNT_STRIP_PATTERN.sub('', text)
+    if '萬' in text or '万' in text:
+        return int(float(text.replace('萬', '').replace('万', '').replace(',', '')) * 10000)
+    if text:
+        return int(text.replace(',', ''))
+    return 0
+
+def parse_ios_rating(text: str) -> Tuple[str, Optional[str]]:
+    rating_match = _IOS_RATING_PATTERN.search(text)
+    if rating_match:
+        return rating_match.group(1), f"{parse_count(rating_match.group(2)):,}"
+    return text, None
+
+def parse_android_rating(text: str) -> Optional[str]:
+    rating_match = _ANDROID_RATING_PATTERN.search(text)
+    return rating_match.group(1) if rating_match else None
+
 class AppInfo(BaseModel):
     platform: str
     app_name: str
@@ -69,8 +99,14 @@ class AppInfo(BaseModel):
         }
 
 class AppScraper:
-    def __init__(self):
-        self.setup_driver()
+    def __init__(self, profile: Union[str, LoadProfile, None] = None, driver=None):
+        self._matcher: Optional[AppNameMatcher] = None
+        self.profile = profile if isinstance(profile, LoadProfile) else get_load_profile(profile)
+        if driver is not None:
+            # 離線測試時注入載入 HTML 快照的 driver，略過 Chrome 初始化
+            self.driver = driver
+        else:
+            self.setup_driver()
 
     def setup_driver(self):
         chrome_options = webdriver.ChromeOptions()
@@ -91,6 +127,9 @@ class AppScraper:
         chrome_options.add_argument('--accept-lang=zh-TW')
         chrome_options.page_load_strategy = 'eager'
         chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+        if self.profile.collect_metrics:
+            # 透過 performance log 統計每個頁面的傳輸量
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
         if os.environ.get('CHROME_BIN'):
             chrome_path = os.environ.get('CHROME_BIN')
@@ -115,9 +154,43 @@ class AppScraper:
                     logger.error(f"直接使用Chrome失敗: {e2}")
                     raise
         
-        self.driver.set_page_load_timeout(30)
-        self.driver.set_script_timeout(30)
-        logger.info("WebDriver 初始化完成")
+        self.driver.set_page_load_timeout(self.profile.page_load_timeout)
+        self.driver.set_script_timeout(self.profile.script_timeout)
+        self.apply_load_profile()
+        logger.info(f"WebDriver 初始化完成，載入設定檔: {self.profile.name}")
+
+    def apply_load_profile(self):
+        if not self.profile.blocked_urls:
+            return
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.profile.blocked_urls})
+            logger.info(f"已封鎖 {len(self.profile.blocked_urls)} 種非必要資源")
+        except Exception as e:
+            logger.warning(f"設定資源封鎖失敗，將載入完整頁面: {e}")
+
+    def start_page_metrics(self) -> float:
+        if self.profile.collect_metrics:
+            try:
+                # 清空前一個頁面殘留的 performance log
+                self.driver.get_log('performance')
+            except Exception:
+                pass
+        return time.perf_counter()
+
+    def record_page_metrics(self, platform: str, url: str, started: float):
+        elapsed = time.perf_counter() - started
+        metrics = {}
+        if self.profile.collect_metrics:
+            try:
+                metrics = summarize_performance_log(self.driver.get_log('performance'))
+            except Exception as e:
+                logger.warning(f"讀取頁面載入統計失敗: {e}")
+        over_budget = elapsed > self.profile.page_budget(platform)
+        page_load_stats.record(self.profile.name, platform, elapsed, metrics, over_budget)
+        if over_budget:
+            logger.warning(f"{platform} 頁面超過時間預算 {self.profile.page_budget(platform)} 秒: {url}, 耗時 {elapsed:.1f} 秒")
+        logger.info(f"{platform} 頁面載入統計: {url}, 耗時 {elapsed:.1f} 秒, {metrics}")
 
     def calculate_similarity(self, str1: str, str2: str) -> float:
         return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
@@ -129,29 +202,32 @@ class AppScraper:
         while retry_count < max_retries:
             try:
                 logger.info(f"開始爬取 iOS 應用程式: {url}")
+                page_started = self.start_page_metrics()
                 self.driver.get(url)
-                wait = WebDriverWait(self.driver, 10)
+                wait = WebDriverWait(self.driver, self.profile.ios_wait_timeout)
                 wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")), message="頁面加載超時")
 
                 # 應用程式名稱
+                field_started = time.perf_counter()
                 app_name = "未知名稱"
                 try:
                     app_name_element = wait.until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, "h1.product-header__title"))
                     )
-                    app_name = re.sub(r'\s+\d+\+$', '', app_name_element.text.strip())
-                    logger.info(f"提取應用程式名稱: {app_name}")
+                    app_name = clean_ios_app_name(app_name_element.text)
+                    log_field("iOS", "app_name", app_name, field_started, url)
                 except Exception as e:
                     try:
                         app_name_element = wait.until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, ".app-header__title"))
                         )
-                        app_name = re.sub(r'\s+\d+\+$', '', app_name_element.text.strip())
-                        logger.info(f"使用備用選擇器提取應用程式名稱: {app_name}")
+                        app_name = clean_ios_app_name(app_name_element.text)
+                        log_field("iOS", "app_name", app_name, field_started, url)
                     except Exception as backup_e:
                         logger.error(f"iOS - 提取應用程式名稱時出錯: {e}, 備用錯誤: {backup_e}")
 
                 # 應用程式類別
+                field_started = time.perf_counter()
                 category = "未知類別"
                 try:
                     category_elements = wait.until(
@@ -160,26 +236,28 @@ class AppScraper:
                     for element in category_elements:
                         text = element.text.strip()
                         if "「" in text and "」" in text:
-                            category_match = re.search(r'「(.+?)」', text)
-                            if category_match:
-                                category = category_match.group(1)
+                            parsed_category = parse_ios_category(text)
+                            if parsed_category:
+                                category = parsed_category
                                 break
-                    logger.info(f"提取類別: {category}")
+                    log_field("iOS", "category", category, field_started, url)
                 except Exception as e:
                     logger.error(f"iOS - 提取類別時出錯: {e}")
 
                 # 開發者
+                field_started = time.perf_counter()
                 developer = "未知開發者"
                 try:
                     developer_element = wait.until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, ".app-header__identity a, .product-header__identity a"))
                     )
                     developer = developer_element.text.strip()
-                    logger.info(f"提取開發者: {developer}")
+                    log_field("iOS", "developer", developer, field_started, url)
                 except Exception as e:
                     logger.error(f"iOS - 提取開發者時出錯: {e}")
 
                 # 評分資訊
+                field_started = time.perf_counter()
                 rating = "未知評分"
                 rating_count = "未知評分數"
                 try:
@@ -187,22 +265,15 @@ class AppScraper:
                         EC.presence_of_element_located((By.CSS_SELECTOR, ".we-rating-count, .star-rating__count"))
                     )
                     rating_info = rating_element.text.strip()
-                    rating_match = re.search(r'([\d.]+)\s*[•·]\s*([\d,.万]+)', rating_info)
-                    if rating_match:
-                        rating = rating_match.group(1)
-                        rating_count_raw = rating_match.group(2)
-                        if '万' in rating_count_raw:
-                            rating_count = int(float(rating_count_raw.replace('万', '')) * 10000)
-                        else:
-                            rating_count = int(rating_count_raw.replace(',', ''))
-                        rating_count = f"{rating_count:,}"
-                    else:
-                        rating = rating_info
-                    logger.info(f"提取評分: {rating}, 評分數: {rating_count}")
+                    rating, parsed_count = parse_ios_rating(rating_info)
+                    if parsed_count:
+                        rating_count = parsed_count
+                    log_field("iOS", "rating", {"rating": rating, "rating_count": rating_count}, field_started, url)
                 except Exception as e:
                     logger.error(f"iOS - 提取評分時出錯: {e}")
 
                 # 價格
+                field_started = time.perf_counter()
                 price = "未知價格"
                 try:
                     price_elements = wait.until(
@@ -213,11 +284,12 @@ class AppScraper:
                         if "免費" in text or "$" in text:
                             price = text
                             break
-                    logger.info(f"提取價格: {price}")
+                    log_field("iOS", "price", price, field_started, url)
                 except Exception as e:
                     logger.error(f"iOS - 提取價格時出錯: {e}")
 
                 # 應用程式圖示 URL
+                field_started = time.perf_counter()
                 icon_url = "未知圖示URL"
                 try:
                     icon_elements = wait.until(
@@ -226,28 +298,29 @@ class AppScraper:
                     icon_srcset = icon_elements.get_attribute("srcset")
                     if icon_srcset:
                         icon_url = icon_srcset.split(",")[0].split(" ")[0]
-                    logger.info(f"提取圖示 URL: {icon_url}")
+                    log_field("iOS", "icon_url", icon_url, field_started, url)
                 except Exception as e:
                     try:
                         icon_element = wait.until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, ".we-artwork__source"))
                         )
                         icon_url = icon_element.get_attribute("srcset").split(",")[0].split(" ")[0]
-                        logger.info(f"使用備用選擇器提取圖示 URL: {icon_url}")
+                        log_field("iOS", "icon_url", icon_url, field_started, url)
                     except Exception as backup_e:
                         logger.error(f"iOS - 提取圖示URL時出錯: {e}, 備用錯誤: {backup_e}")
 
                 # 版本資訊和更新日期
+                field_started = time.perf_counter()
                 version = "未知版本"
                 update_date = "未知更新日期"
                 try:
-                    logger.info("嘗試點擊版本紀錄按鈕")
+                    logger.debug("嘗試點擊版本紀錄按鈕")
                     version_button = wait.until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, "button.we-modal__show.link"))
                     )
                     self.driver.execute_script("arguments[0].click();", version_button)
                     
-                    logger.info("等待版本歷史視窗加載")
+                    logger.debug("等待版本歷史視窗加載")
                     wait.until(
                         EC.visibility_of_element_located((By.CSS_SELECTOR, ".version-history__item__version-number")),
                         message="版本歷史視窗未正確加載"
@@ -262,14 +335,14 @@ class AppScraper:
                         EC.presence_of_element_located((By.CSS_SELECTOR, ".version-history__item__release-date"))
                     )
                     update_date = date_element.text.strip()
-                    logger.info(f"提取版本: {version}, 更新日期: {update_date}")
+                    log_field("iOS", "version", {"version": version, "update_date": update_date}, field_started, url)
 
                     try:
                         close_button = wait.until(
                             EC.element_to_be_clickable((By.CSS_SELECTOR, ".we-modal__close"))
                         )
                         self.driver.execute_script("arguments[0].click();", close_button)
-                        logger.info("成功關閉版本歷史視窗")
+                        logger.debug("成功關閉版本歷史視窗")
                     except Exception:
                         logger.warning("iOS - 關閉版本歷史視窗失敗，但繼續執行")
 
@@ -288,6 +361,7 @@ class AppScraper:
                     version=version,
                     update_date=update_date
                 )
+                self.record_page_metrics("iOS", url, page_started)
                 logger.info(f"iOS 應用程式爬取完成: {app_name}")
                 return app_info
 
@@ -312,36 +386,40 @@ class AppScraper:
         while retry_count < max_retries:
             try:
                 logger.info(f"開始爬取 Android 應用程式: {url}")
+                page_started = self.start_page_metrics()
                 self.driver.get(url)
-                wait = WebDriverWait(self.driver, 20)
+                wait = WebDriverWait(self.driver, self.profile.android_wait_timeout)
                 wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")), message="頁面加載超時")
 
                 # 多次滾動頁面以觸發動態內容
-                for _ in range(3):  # 增加滾動次數
+                for _ in range(self.profile.android_scroll_times):
                     self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
+                    time.sleep(self.profile.android_scroll_pause)
 
                 # 應用程式名稱
+                field_started = time.perf_counter()
                 app_name = "未知名稱"
                 try:
                     app_name_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1 span")))
                     app_name = app_name_element.text.strip()
-                    logger.info(f"提取應用程式名稱: {app_name}")
+                    log_field("Android", "app_name", app_name, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取應用程式名稱時出錯: {e}")
 
                 # 開發者
+                field_started = time.perf_counter()
                 developer = "未知開發者"
                 try:
                     developer_element = wait.until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, ".Vbfug.auoIOc a span"))
                     )
                     developer = developer_element.text.strip()
-                    logger.info(f"提取開發者: {developer}")
+                    log_field("Android", "developer", developer, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取開發者時出錯: {e}")
 
                 # 評分
+                field_started = time.perf_counter()
                 rating = "未知評分"
                 try:
                     rating_element = wait.until(
@@ -350,40 +428,33 @@ class AppScraper:
                         )
                     )
                     rating_text = rating_element.text.strip() or rating_element.get_attribute("aria-label")
-                    rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                    if rating_match:
-                        rating = rating_match.group(1)
-                    logger.info(f"提取評分: {rating}")
+                    rating = parse_android_rating(rating_text) or rating
+                    log_field("Android", "rating", rating, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取評分時出錯: {str(e)}")
 
                 # 評分數
+                field_started = time.perf_counter()
                 rating_count = "未知評分數"
                 try:
                     rating_count_elements = self.driver.find_elements(By.CSS_SELECTOR, ".g1rdde")
                     rating_count_text = None
                     for elem in rating_count_elements:
                         text = elem.text.strip()
-                        if "評論" in text or re.search(r'[\d,.萬]+', text):  # 尋找包含評論或數字的元素
+                        if "評論" in text or _COUNT_TEXT_PATTERN.search(text):  # 尋找包含評論或數字的元素
                             rating_count_text = text
                             break
                     if not rating_count_text:
                         raise Exception("未找到評論數元素")
                     
                     logger.debug(f"原始評分數文本: {rating_count_text}")
-                    rating_count_text = re.sub(r'[^\d,.萬]', '', rating_count_text)
-                    if "萬" in rating_count_text:
-                        rating_count = int(float(rating_count_text.replace("萬", "")) * 10000)
-                    elif rating_count_text:
-                        rating_count = int(rating_count_text.replace(",", ""))
-                    else:
-                        rating_count = 0
-                    rating_count = f"{rating_count:,}"
-                    logger.info(f"提取評分數: {rating_count}")
+                    rating_count = f"{parse_count(rating_count_text):,}"
+                    log_field("Android", "rating_count", rating_count, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取評分數時出錯: {str(e)}")
 
                 # 價格
+                field_started = time.perf_counter()
                 price = "免費"  # 默認為免費
                 try:
                     price_elements = self.driver.find_elements(By.CSS_SELECTOR, "button[aria-label*='購買'], button[aria-label*='安裝']")
@@ -394,12 +465,13 @@ class AppScraper:
                         elif "安裝" in aria_label:
                             price = "免費"
                             break
-                    logger.info(f"提取價格: {price}")
+                    log_field("Android", "price", price, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取價格時出錯: {str(e)}")
                     price = "免費"  # 失敗時默認為免費
 
                 # 應用程式圖示 URL
+                field_started = time.perf_counter()
                 icon_url = "未知圖示URL"
                 try:
                     icon_element = wait.until(
@@ -407,15 +479,16 @@ class AppScraper:
                     )
                     if icon_element:
                         icon_url = icon_element.get_attribute("src")
-                    logger.info(f"提取圖示 URL: {icon_url}")
+                    log_field("Android", "icon_url", icon_url, field_started, url)
                 except Exception as e:
                     logger.error(f"Android - 提取圖示URL時出錯: {e}")
 
                 # 版本資訊和更新日期
+                field_started = time.perf_counter()
                 version = "未知版本"
                 update_date = "未知更新日期"
                 try:
-                    logger.info("嘗試點擊版本資訊按鈕")
+                    logger.debug("嘗試點擊版本資訊按鈕")
                     button = wait.until(
                         EC.element_to_be_clickable(
                             (By.CSS_SELECTOR, "button.VfPpkd-Bz112c-LgbsSe.yHy1rc.eT1oJ.QDwDD.mN1ivc.VxpoF")
@@ -423,7 +496,7 @@ class AppScraper:
                     )
                     self.driver.execute_script("arguments[0].click();", button)
 
-                    logger.info("等待版本資訊加載")
+                    logger.debug("等待版本資訊加載")
                     wait.until(
                         EC.visibility_of_element_located(
                             (By.XPATH, "//div[@class='sMUprd'][div[text()='版本']]/div[@class='reAt0']")
@@ -444,7 +517,7 @@ class AppScraper:
                         )
                     )
                     update_date = update_date_element.text.strip()
-                    logger.info(f"提取版本: {version}, 更新日期: {update_date}")
+                    log_field("Android", "version", {"version": version, "update_date": update_date}, field_started, url)
 
                 except Exception as e:
                     logger.error(f"Android - 提取版本或更新日期時出錯: {e}")
@@ -469,6 +542,7 @@ class AppScraper:
                         app_info.similarity = f"{similarity:.2%}"
                         logger.info(f"找到相似 iOS 應用: {matching_ios_app}, 相似度: {similarity:.2%}")
 
+                self.record_page_metrics("Android", url, page_started)
                 logger.info(f"Android 應用程式爬取完成: {app_name}")
                 return app_info
 
@@ -480,36 +554,36 @@ class AppScraper:
                     raise
                 time.sleep(2)
 
-    def find_most_similar_ios_app(self, android_app_name: str, ios_app_categories: Dict[str, str]) -> tuple:
-        best_match = None
-        highest_similarity = 0
-
-        android_name_clean = android_app_name.lower()
-        android_name_clean = re.sub(r'（.*?）|\(.*?\)', '', android_name_clean).strip()
-        android_keywords = set(android_name_clean.split())
+    def get_matcher(self, ios_app_categories: Dict[str, str]) -> AppNameMatcher:
+        # 同一批 iOS 應用只建立一次名稱特徵
+        ios_app_names = tuple(ios_app_categories.keys())
+        if self._matcher is None or self._matcher.key != ios_app_names:
+            self._matcher = AppNameMatcher(ios_app_names)
+        return self._matcher
 
-        for ios_app_name in ios_app_categories.keys():
-            ios_name_clean = ios_app_name.lower()
-            full_similarity = self.calculate_similarity(android_name_clean, ios_name_clean)
-
-            ios_keywords = set(ios_name_clean.split())
-            keyword_matches = len(android_keywords.intersection(ios_keywords))
-            keyword_similarity = keyword_matches / max(len(android_keywords), len(ios_keywords))
-
-            combined_similarity = (full_similarity * 0.6) + (keyword_similarity * 0.4)
-
-            for keyword in android_keywords:
-                if len(keyword) > 3 and keyword in ios_name_clean:
-                    combined_similarity += 0.2
-                    break
-
-            if combined_similarity > highest_similarity and combined_similarity > 0.3:
-                highest_similarity = combined_similarity
-                best_match = ios_app_name
-
-        return best_match, highest_similarity
+    def find_most_similar_ios_app(self, android_app_name: str, ios_app_categories: Dict[str, str]) -> tuple:
+        return self.get_matcher(ios_app_categories).best_match(android_app_name)
+
+    def match_android_apps(self, android_apps: List[AppInfo], ios_app_categories: Dict[str, str]) -> List[AppInfo]:
+        """以一對一配對為 Android 應用補上對應 iOS 應用的類別"""
+        if not android_apps or not ios_app_categories:
+            return android_apps
+
+        matches = self.get_matcher(ios_app_categories).assign([app.app_name for app in android_apps])
+        for app_info, (matching_ios_app, similarity) in zip(android_apps, matches):
+            if matching_ios_app:
+                app_info.category = ios_app_categories[matching_ios_app]
+                app_info.ios_similar_app = matching_ios_app
+                app_info.similarity = f"{similarity:.2%}"
+                logger.info(f"找到相似 iOS 應用: {matching_ios_app}, 相似度: {similarity:.2%}")
+        return android_apps
+
+    def close(self):
+        """關閉 WebDriver；可重複呼叫"""
+        driver = self.__dict__.pop('driver', None)
+        if driver is not None:
+            driver.quit()
+            logger.info("WebDriver 已關閉")
 
     def __del__(self):
-        if hasattr(self, 'driver'):
-            self.driver.quit()
-            logger.info("WebDriver 已關閉")
\ No newline at end of file
+        self.close()
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+離線 HTML 快照測試與基準測試
+
+將 fixtures/ 中儲存的 App Store / Google Play 頁面載入 StubDriver，
+不需要 Chrome 或網路即可驗證 AppScraper 的欄位擷取邏輯並量測延遲。
+
+    pytest test_parsers.py     # 正確性測試
+    python test_parsers.py     # 基準測試
+"""
+import asyncio
+import os
+import re
+import time
+from statistics import mean, median
+
+from lxml import html as lxml_html
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from load_profiles import LoadProfile
+from scraper import (
+    AppScraper,
+    clean_ios_app_name,
+    parse_android_rating,
+    parse_count,
+    parse_ios_category,
+    parse_ios_rating,
+)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+IOS_URL = "https://apps.apple.com/tw/app/line/id443904275"
+ANDROID_URL = "https://play.google.com/store/apps/details?id=jp.naver.line.android"
+FIXTURES = {
+    IOS_URL: 'ios_app.html',
+    ANDROID_URL: 'android_app.html',
+}
+
+# 離線測試不需要等待、滾動或讀取 performance log
+OFFLINE_PROFILE = LoadProfile(
+    name="offline",
+    page_load_timeout=0,
+    script_timeout=0,
+    ios_wait_timeout=0,
+    android_wait_timeout=0,
+    android_scroll_times=0,
+    android_scroll_pause=0,
+    collect_metrics=False,
+)
+
+
+class StubElement:
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def text(self) -> str:
+        return re.sub(r'\s+', ' ', self.node.text_content()).strip()
+
+    def get_attribute(self, name: str):
+        return self.node.get(name)
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+
+class StubDriver:
+    """以 lxml 實作 AppScraper 用到的 WebDriver 介面"""
+
+    def __init__(self, fixtures: dict):
+        self.fixtures = fixtures
+        self.tree = None
+
+    def get(self, url: str):
+        # Android URL 會被加上地區參數，以前綴比對快照
+        for fixture_url, filename in self.fixtures.items():
+            if url.startswith(fixture_url):
+                with open(os.path.join(FIXTURE_DIR, filename), encoding='utf-8') as f:
+                    self.tree = lxml_html.fromstring(f.read())
+                return
+        raise ValueError(f"沒有對應的 HTML 快照: {url}")
+
+    def find_elements(self, by: str, value: str):
+        if by == By.CSS_SELECTOR:
+            nodes = self.tree.cssselect(value)
+        elif by == By.XPATH:
+            nodes = self.tree.xpath(value)
+        elif by == By.TAG_NAME:
+            nodes = self.tree.iter(value)
+        else:
+            raise ValueError(f"不支援的定位方式: {by}")
+        return [StubElement(node) for node in nodes]
+
+    def find_element(self, by: str, value: str):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def execute_script(self, script: str, *args):
+        return None
+
+    def quit(self):
+        pass
+
+
+def create_scraper() -> AppScraper:
+    return AppScraper(profile=OFFLINE_PROFILE, driver=StubDriver(FIXTURES))
+
+
+def test_parse_count():
+    assert parse_count("1.2萬") == 12000
+    assert parse_count("3.4万") == 34000
+    assert parse_count("1,260萬 則評論") == 12600000
+    assert parse_count("12,345 則評論") == 12345
+    assert parse_count("") == 0
+
+
+def test_parse_ratings():
+    assert parse_ios_rating("4.7 • 1.2萬 則評分") == ("4.7", "12,000")
+    assert parse_ios_rating("4.5 · 3,456 個評分") == ("4.5", "3,456")
+    assert parse_ios_rating("尚無評分") == ("尚無評分", None)
+    assert parse_android_rating("4.1star") == "4.1"
+    assert parse_android_rating("沒有評分") is None
+
+
+def test_parse_ios_header():
+    assert clean_ios_app_name("LINE 4+") == "LINE"
+    assert clean_ios_app_name("IKEA 台灣 12+") == "IKEA 台灣"
+    assert parse_ios_category("「社交」類排名第 1") == "社交"
+
+
+def test_ios_fixture():
+    app_info = asyncio.run(create_scraper().scrape_ios_app(IOS_URL))
+    assert app_info.app_name == "LINE"
+    assert app_info.category == "社交"
+    assert app_info.developer == "LINE Corporation"
+    assert app_info.rating == "4.7"
+    assert app_info.rating_count == "12,000"
+    assert app_info.price == "免費"
+    assert app_info.icon_url == "https://is1-ssl.mzstatic.com/image/thumb/Purple/line/230x0w.webp"
+    assert app_info.version == "14.3.0"
+    assert app_info.update_date == "2024年3月12日"
+
+
+def test_android_fixture():
+    app_info = asyncio.run(create_scraper().scrape_android_app(ANDROID_URL, {"LINE": "社交"}))
+    assert app_info.app_name == "LINE"
+    assert app_info.developer == "LINE (LY Corporation)"
+    assert app_info.rating == "4.1"
+    assert app_info.rating_count == "12,600,000"
+    assert app_info.price == "免費"
+    assert app_info.icon_url == "https://play-lh.googleusercontent.com/line-icon=w240-h480"
+    assert app_info.version == "14.3.1"
+    assert app_info.update_date == "2024年3月15日"
+    assert app_info.category == "社交"
+    assert app_info.ios_similar_app == "LINE"
+
+
+def benchmark(name: str, func, iterations: int):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<28} 平均 {mean(timings):>10.1f} µs  中位數 {median(timings):>10.1f} µs  p95 {p95:>10.1f} µs")
+
+
+def run_benchmarks(iterations: int = 200):
+    scraper = create_scraper()
+    driver = scraper.driver
+    driver.get(IOS_URL)
+
+    print(f"每項執行 {iterations} 次\n")
+    benchmark("parse_count", lambda: parse_count("1,260萬 則評論"), iterations * 50)
+    benchmark("parse_ios_rating", lambda: parse_ios_rating("4.7 • 1.2萬 則評分"), iterations * 50)
+    benchmark("parse_android_rating", lambda: parse_android_rating("4.1star"), iterations * 50)
+    benchmark("css 元素查詢", lambda: driver.find_elements(By.CSS_SELECTOR, ".inline-list__item"), iterations * 10)
+    benchmark("iOS 頁面完整擷取", lambda: asyncio.run(scraper.scrape_ios_app(IOS_URL)), iterations)
+    benchmark("Android 頁面完整擷取", lambda: asyncio.run(scraper.scrape_android_app(ANDROID_URL)), iterations)
+
+
+if __name__ == "__main__":
+    run_benchmarks()
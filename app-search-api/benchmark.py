@@ -0,0 +1,177 @@
+"""
+搜尋延遲基準測試
+
+以本機的 aiohttp 模擬伺服器回傳 fixtures/ 中錄製的 Apple / Google 搜尋頁面，
+可設定延遲、抖動與錯誤比例，在不同同時數下量測 AppSearchManager 的吞吐量與尾端延遲，
+不需要網路即可比較連線池與解析方式的調整。
+
+    python benchmark.py
+    python benchmark.py --concurrency 1 16 64 --requests 400 --latency 0.08 --error-rate 0.02
+    SEARCH_CONNECTION_LIMIT_PER_HOST=50 python benchmark.py
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from statistics import mean
+from typing import Dict, List
+
+from aiohttp import web
+
+from cache import SearchCache
+from scraper import AppSearchManager
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+APPLE_FIXTURE = 'apple_search.html'
+GOOGLE_FIXTURE = 'google_search.html'
+
+# 填充用的區塊，讓頁面大小接近實際的搜尋結果頁
+_PADDING_BLOCK = '<div class="filler"><span>{index}</span><p>' + 'x' * 200 + '</p></div>\n'
+
+
+def load_fixture(filename: str, pad_kb: int = 0) -> str:
+    with open(os.path.join(FIXTURE_DIR, filename), encoding='utf-8') as f:
+        html = f.read()
+    if pad_kb > 0:
+        block_count = pad_kb * 1024 // len(_PADDING_BLOCK)
+        padding = ''.join(_PADDING_BLOCK.format(index=i) for i in range(block_count))
+        html = html.replace('</body>', padding + '</body>')
+    return html
+
+
+class StubStore:
+    """模擬 Apple 與 Google 的搜尋頁面，每個請求加上延遲並依比例回傳 503"""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, pad_kb: int, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pages = {
+            'apple': load_fixture(APPLE_FIXTURE, pad_kb),
+            'google': load_fixture(GOOGLE_FIXTURE, pad_kb),
+        }
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    async def respond(self, page: str) -> web.Response:
+        self.requests += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text='Service Unavailable')
+        return web.Response(text=self.pages[page], content_type='text/html')
+
+    async def handle_apple(self, request: web.Request) -> web.Response:
+        return await self.respond('apple')
+
+    async def handle_google(self, request: web.Request) -> web.Response:
+        return await self.respond('google')
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/tw/search/{term}', self.handle_apple)
+        app.router.add_get('/store/search', self.handle_google)
+        return app
+
+
+async def start_stub_server(store: StubStore, host: str = '127.0.0.1', port: int = 0):
+    runner = web.AppRunner(store.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    # port 為 0 時由系統指定可用的連接埠
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_level(manager: AppSearchManager, terms: List[str], concurrency: int) -> Dict:
+    """以固定同時數搜尋所有搜尋詞，每個搜尋詞包含 Apple 與 Google 兩個請求"""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: List[float] = []
+    found = 0
+
+    async def search(term: str):
+        nonlocal found
+        async with semaphore:
+            started = time.perf_counter()
+            results = await manager.search_all_platforms([term])
+            timings.append((time.perf_counter() - started) * 1000)
+            found += sum(1 for result in results if result["found"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(search(term) for term in terms))
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "concurrency": concurrency,
+        "terms": len(terms),
+        "throughput": len(terms) / elapsed if elapsed else 0.0,
+        "mean": mean(timings),
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "p99": percentile(timings, 99),
+        "found_rate": found / (len(terms) * 2),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace):
+    # 注入的 503 會讓 scraper 逐筆記錄警告，量測時只保留錯誤
+    logging.getLogger('scraper').setLevel(logging.ERROR)
+    store = StubStore(args.latency, args.jitter, args.error_rate, args.pad_kb, args.seed)
+    runner, base_url = await start_stub_server(store)
+    # 停用快取並讓每個搜尋詞都不同，確保每次都實際發出請求與解析；
+    # 每個搜尋詞查詢兩個平台，上游查詢數上限設為最高並行數的兩倍，只由連線池限制
+    manager = AppSearchManager(
+        apple_search_url=f"{base_url}/tw/search",
+        google_search_url=f"{base_url}/store/search",
+        cache=SearchCache(hit_ttl=0, miss_ttl=0, max_concurrent_fetches=2 * max(args.concurrency)),
+    )
+    await manager.start()
+
+    print(f"模擬伺服器 {base_url}  延遲 {args.latency * 1000:.0f} ms + 抖動 {args.jitter * 1000:.0f} ms  "
+          f"錯誤比例 {args.error_rate:.1%}  頁面填充 {args.pad_kb} KB")
+    print(f"{'同時數':>6} {'搜尋詞':>6} {'吞吐量/s':>10} {'平均 ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'找到比例':>8}")
+    try:
+        if args.warmup:
+            await run_level(manager, [f"warmup {i}" for i in range(args.warmup)], max(args.concurrency))
+        for level, concurrency in enumerate(args.concurrency):
+            terms = [f"ikea {level}-{i}" for i in range(args.requests)]
+            stats = await run_level(manager, terms, concurrency)
+            print(f"{stats['concurrency']:>6} {stats['terms']:>6} {stats['throughput']:>10.1f} "
+                  f"{stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} "
+                  f"{stats['found_rate']:>8.1%}")
+    finally:
+        await manager.close()
+        await runner.cleanup()
+
+    print(f"\n模擬伺服器共收到 {store.requests} 個請求，注入 {store.errors} 個錯誤")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AppSearchManager 離線基準測試")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64], help='要量測的同時數')
+    parser.add_argument('--requests', type=int, default=200, help='每個同時數搜尋的搜尋詞數量')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬伺服器的基本延遲（秒）')
+    parser.add_argument('--jitter', type=float, default=0.05, help='延遲的隨機抖動上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回傳 503 的比例')
+    parser.add_argument('--pad-kb', type=int, default=100, help='在頁面中填充的大小（KB）')
+    parser.add_argument('--warmup', type=int, default=20, help='正式量測前的暖機搜尋數')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(parse_args()))
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+CACHE_HIT_TTL = float(os.environ.get('SEARCH_CACHE_HIT_TTL', 6 * 60 * 60))
+CACHE_MISS_TTL = float(os.environ.get('SEARCH_CACHE_MISS_TTL', 10 * 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 5000))
+# 同時向上游進行的查詢數上限，所有端點共用
+MAX_CONCURRENT_FETCHES = int(os.environ.get('SEARCH_MAX_CONCURRENT_FETCHES', 32))
+
+
+class SearchCache:
+    """搜尋結果快取：找到與找不到的結果分別設定存活時間，並合併同時進行的相同查詢"""
+
+    def __init__(
+        self,
+        hit_ttl: float = CACHE_HIT_TTL,
+        miss_ttl: float = CACHE_MISS_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_concurrent_fetches: int = MAX_CONCURRENT_FETCHES,
+    ):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self.max_concurrent_fetches = max_concurrent_fetches
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # 每個進行中的查詢目前有幾個呼叫端在等待
+        self._waiters: Dict[Hashable, int] = {}
+        self._fetch_slots: Optional[asyncio.Semaphore] = None
+        self.fetching = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, found: bool):
+        ttl = self.hit_ttl if found else self.miss_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        is_found: Callable[[Any], bool],
+        is_cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        # 相同的查詢正在進行中時等待其結果，不重複向上游發出請求
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch, is_found, is_cacheable))
+            # 所有等待者都已取消時，避免出現 "exception was never retrieved" 警告
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # 呼叫端逾時或取消時，只有在沒有其他呼叫端等待同一個查詢時才中斷上游請求
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            remaining = self._waiters[key] - 1
+            if remaining:
+                self._waiters[key] = remaining
+            else:
+                del self._waiters[key]
+                if not task.done():
+                    # 先移除，之後的相同查詢會重新發出請求，不會等到已取消的工作
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+                    task.cancel()
+                    self.cancelled += 1
+
+    async def _fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        is_found: Callable[[Any], bool],
+        is_cacheable: Callable[[Any], bool],
+    ) -> Any:
+        if self._fetch_slots is None:
+            self._fetch_slots = asyncio.Semaphore(self.max_concurrent_fetches)
+        try:
+            async with self._fetch_slots:
+                self.fetching += 1
+                try:
+                    value = await fetch()
+                finally:
+                    self.fetching -= 1
+            if is_cacheable(value):
+                self.set(key, value, is_found(value))
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "fetching": self.fetching,
+            "max_concurrent_fetches": self.max_concurrent_fetches,
+            "cancelled": self.cancelled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "hit_ttl": self.hit_ttl,
+            "miss_ttl": self.miss_ttl,
+        }
@@ -1,13 +1,34 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from scraper import AppSearchManager
 import asyncio
+import json
+import os
+import time
+
+# 批次搜尋的同時處理數量、每個搜尋詞的時限（秒）與單次請求的搜尋詞上限
+BATCH_WORKERS = int(os.environ.get('SEARCH_BATCH_WORKERS', 16))
+BATCH_TERM_DEADLINE = float(os.environ.get('SEARCH_BATCH_TERM_DEADLINE', 20))
+BATCH_MAX_TERMS = int(os.environ.get('SEARCH_BATCH_MAX_TERMS', 1000))
+
+# 所有請求共用同一個 AppSearchManager 與其連線池
+search_manager = AppSearchManager()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await search_manager.start()
+    yield
+    await search_manager.close()
 
 app = FastAPI(
     title="App Search API",
     description="搜尋 App Store 和 Google Play Store 的應用程式資訊",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 設定 CORS
@@ -26,8 +47,7 @@ async def root():
 @app.get("/search/{search_term}")
 async def search_app(search_term: str):
     try:
-        manager = AppSearchManager()
-        results = await manager.search_all_platforms([search_term])
+        results = await search_manager.search_all_platforms([search_term])
         return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -35,12 +55,92 @@ async def search_app(search_term: str):
 @app.get("/search-multiple")
 async def search_multiple_apps(search_terms: List[str] = Query(...)):
     try:
-        manager = AppSearchManager()
-        results = await manager.search_all_platforms(search_terms)
+        results = await search_manager.search_all_platforms(search_terms)
         return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class WarmupRequest(BaseModel):
+    search_terms: List[str]
+
+@app.post("/search/warmup")
+async def warmup_search_cache(request: WarmupRequest):
+    """預先搜尋已知的競品清單，將結果寫入快取"""
+    try:
+        results = await search_manager.search_all_platforms(request.search_terms)
+        return {
+            "warmed": len(request.search_terms),
+            "found": sum(1 for result in results if result["found"]),
+            "cache": search_manager.cache.stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BatchSearchRequest(BaseModel):
+    search_terms: List[str] = Field(..., min_length=1)
+    workers: Optional[int] = Field(None, ge=1, le=64)
+    term_deadline: Optional[float] = Field(None, gt=0, le=120)
+
+def stream_event(event_type: str, data) -> str:
+    return json.dumps({"type": event_type, "data": data}, ensure_ascii=False) + "\n"
+
+async def run_batch_search(terms: List[str], workers: int, deadline: float):
+    """以固定數量的 worker 處理搜尋詞，每完成一個就送出結果，逾時的搜尋詞回傳 timeout"""
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, term in enumerate(terms):
+        pending.put_nowait((index, term))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, term = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                results = await asyncio.wait_for(search_manager.search_all_platforms([term]), deadline)
+                event = stream_event("result", {"index": index, "search_term": term, "results": results,
+                                                "elapsed": round(time.perf_counter() - started, 3)})
+            except asyncio.TimeoutError:
+                event = stream_event("timeout", {"index": index, "search_term": term, "deadline": deadline})
+            except Exception as e:
+                event = stream_event("error", {"index": index, "search_term": term, "error": str(e)})
+            await finished.put(event)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(min(workers, len(terms)))]
+    try:
+        for _ in terms:
+            yield await finished.get()
+        yield stream_event("done", {"total": len(terms), "cache": search_manager.cache.stats()})
+    finally:
+        # 用戶端中途斷線時停止剩餘的搜尋
+        for task in tasks:
+            task.cancel()
+
+@app.post("/search/batch")
+async def batch_search(request: BatchSearchRequest):
+    """大量搜尋詞以 NDJSON 串流回傳，結果依完成順序送出，以 index 對應請求中的位置"""
+    if len(request.search_terms) > BATCH_MAX_TERMS:
+        raise HTTPException(status_code=400, detail=f"search_terms 最多 {BATCH_MAX_TERMS} 個")
+    return StreamingResponse(
+        run_batch_search(
+            request.search_terms,
+            request.workers or BATCH_WORKERS,
+            request.term_deadline or BATCH_TERM_DEADLINE,
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return search_manager.cache.stats()
+
+@app.delete("/cache")
+async def clear_cache():
+    search_manager.cache.clear()
+    return {"message": "快取已清除"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
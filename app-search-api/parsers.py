@@ -0,0 +1,107 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from lxml import html as lxml_html
+
+T = TypeVar('T')
+
+# lxml 解析時會釋放 GIL，放在執行緒池中可以與其他搜尋同時進行
+PARSE_WORKERS = int(os.environ.get('SEARCH_PARSE_WORKERS', min(4, os.cpu_count() or 1)))
+_parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='search-parser')
+
+APPLE_PRODUCT_CLASS = 'rf-serp-product-description'
+APPLE_NAME_CLASS = 'rf-serp-productname'
+GOOGLE_NAME_CLASSES = ('vWM94c', 'ubGTjb')
+# 搜尋結果清單中每個應用的名稱
+GOOGLE_RESULT_NAME_CLASSES = GOOGLE_NAME_CLASSES + ('DdYX5',)
+GOOGLE_DETAILS_PATH = '/store/apps/details'
+
+# (名稱, 連結)
+Candidate = Tuple[str, Optional[str]]
+
+
+def _has_class(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+_APPLE_PRODUCT_XPATH = f"//div[{_has_class(APPLE_PRODUCT_CLASS)}]"
+_APPLE_NAME_XPATH = f".//h2[{_has_class(APPLE_NAME_CLASS)}]"
+_GOOGLE_NAME_XPATHS = {name: f"//div[{_has_class(name)}]" for name in GOOGLE_NAME_CLASSES}
+_GOOGLE_LINK_XPATH = f"//a[contains(@href, '{GOOGLE_DETAILS_PATH}')]"
+_GOOGLE_RESULT_NAME_XPATH = ".//*[" + " or ".join(_has_class(name) for name in GOOGLE_RESULT_NAME_CLASSES) + "]"
+
+
+def _text(node, strip_parts: bool = False) -> str:
+    if strip_parts:
+        # 與 BeautifulSoup 的 get_text(strip=True) 相同：各段文字去除空白後直接相接
+        return ''.join(part.strip() for part in node.itertext() if part.strip())
+    return node.text_content().strip()
+
+
+def _google_link(href: str) -> str:
+    return f"https://play.google.com{href}&hl=zh_TW"
+
+
+def parse_apple_search(html: str, limit: int = 1) -> List[Candidate]:
+    """依頁面順序回傳最多 limit 個產品區塊的 (名稱, 連結)"""
+    # 頁面中沒有產品區塊時不需要建立 DOM
+    if APPLE_PRODUCT_CLASS not in html:
+        return []
+
+    document = lxml_html.fromstring(html)
+    candidates: List[Candidate] = []
+    for product_block in document.xpath(_APPLE_PRODUCT_XPATH):
+        name_tags = product_block.xpath(_APPLE_NAME_XPATH)
+        if not name_tags:
+            continue
+        link_tags = product_block.xpath('.//a[@href]')
+        link = link_tags[0].get('href') if link_tags else None
+        candidates.append((_text(name_tags[0], strip_parts=True), link))
+        if len(candidates) >= limit:
+            break
+    return candidates
+
+
+def parse_google_search(html: str, limit: int = 1) -> List[Candidate]:
+    """依頁面順序回傳最多 limit 個應用的 (名稱, 詳細頁連結)"""
+    if not any(class_name in html for class_name in GOOGLE_RESULT_NAME_CLASSES):
+        return []
+
+    document = lxml_html.fromstring(html)
+    link_elements = document.xpath(_GOOGLE_LINK_XPATH)
+    candidates: List[Candidate] = []
+    seen_links = set()
+
+    # 第一個候選與原本相同：頁面上的主要名稱區塊搭配第一個詳細頁連結
+    for class_name in GOOGLE_NAME_CLASSES:
+        name_divs = document.xpath(_GOOGLE_NAME_XPATHS[class_name])
+        if not name_divs:
+            continue
+        app_name = _text(name_divs[0])
+        if app_name:
+            link = _google_link(link_elements[0].get('href')) if link_elements else None
+            candidates.append((app_name, link))
+            seen_links.add(link)
+        break
+
+    # 其餘候選：每個詳細頁連結內的應用名稱
+    for link_element in link_elements:
+        if len(candidates) >= limit:
+            break
+        link = _google_link(link_element.get('href'))
+        if link in seen_links:
+            continue
+        name_nodes = link_element.xpath(_GOOGLE_RESULT_NAME_XPATH)
+        app_name = _text(name_nodes[0]) if name_nodes else ''
+        if app_name:
+            candidates.append((app_name, link))
+            seen_links.add(link)
+    return candidates[:limit]
+
+
+async def run_parser(parser: Callable[..., T], html: str, *args) -> T:
+    """在解析執行緒池中執行，避免 CPU 密集的解析阻塞事件迴圈"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parse_executor, parser, html, *args)
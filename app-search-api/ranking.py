@@ -0,0 +1,57 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# 每個商店從同一個搜尋頁面擷取的候選數量
+MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', 5))
+# 頁面排序的權重：分數相近時以商店原本的順序為準
+POSITION_PENALTY = 0.02
+
+_SPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_term(term: str) -> str:
+    """全形轉半形、忽略大小寫並合併空白，讓「ＩＫＥＡ　台灣」與「ikea 台灣」視為相同"""
+    term = unicodedata.normalize('NFKC', term).casefold()
+    return _SPACE_PATTERN.sub(' ', term).strip()
+
+
+def _bigrams(text: str) -> Counter:
+    text = text.replace(' ', '')
+    if len(text) < 2:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def similarity(query: str, name: str) -> float:
+    """以字元雙連詞的 Dice 係數比較搜尋詞與應用名稱，完全包含搜尋詞時提高分數"""
+    query, name = normalize_term(query), normalize_term(name)
+    if not query or not name:
+        return 0.0
+    if query == name:
+        return 1.0
+
+    query_grams, name_grams = _bigrams(query), _bigrams(name)
+    total = sum(query_grams.values()) + sum(name_grams.values())
+    score = 2 * sum((query_grams & name_grams).values()) / total if total else 0.0
+    if query in name:
+        score = max(score, 0.5 + 0.5 * len(query) / len(name))
+    return score
+
+
+def rank_candidates(query: str, candidates: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+    ranked = []
+    for position, (name, link) in enumerate(candidates):
+        score = similarity(query, name)
+        ranked.append({
+            "name": name,
+            "link": link,
+            "score": round(score, 4),
+            "_rank_key": score - position * POSITION_PENALTY,
+        })
+    ranked.sort(key=lambda candidate: candidate["_rank_key"], reverse=True)
+    for candidate in ranked:
+        del candidate["_rank_key"]
+    return ranked
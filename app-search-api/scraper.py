@@ -1,91 +1,149 @@
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
 from typing import Dict, Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 import logging
+import os
+from cache import SearchCache
+from parsers import parse_apple_search, parse_google_search, run_parser
+from ranking import MAX_CANDIDATES, normalize_term, rank_candidates
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 共用連線池設定
+CONNECTION_LIMIT = int(os.environ.get('SEARCH_CONNECTION_LIMIT', 100))
+CONNECTION_LIMIT_PER_HOST = int(os.environ.get('SEARCH_CONNECTION_LIMIT_PER_HOST', 20))
+DNS_CACHE_TTL = int(os.environ.get('SEARCH_DNS_CACHE_TTL', 300))
+KEEPALIVE_TIMEOUT = float(os.environ.get('SEARCH_KEEPALIVE_TIMEOUT', 60))
+REQUEST_TIMEOUT = float(os.environ.get('SEARCH_REQUEST_TIMEOUT', 15))
+
+# 搜尋頁面位址，基準測試時可指向本機的模擬伺服器
+APPLE_SEARCH_URL = os.environ.get('APPLE_SEARCH_URL', 'https://www.apple.com/tw/search')
+GOOGLE_SEARCH_URL = os.environ.get('GOOGLE_SEARCH_URL', 'https://play.google.com/store/search')
+
 class AppInfo(BaseModel):
     name: Optional[str] = None
     link: Optional[str] = None
     platform: str = ""
     search_term: str = ""
     found: bool = False
+    # 同一個搜尋頁面中依相似度排序的候選應用，第一個即為 name / link
+    candidates: List[Dict] = []
+    # 上游請求失敗（非 200 或連線錯誤）的結果不寫入快取
+    _upstream_error: bool = PrivateAttr(default=False)
 
 class AppSearchManager:
-    def __init__(self):
+    def __init__(
+        self,
+        apple_search_url: str = APPLE_SEARCH_URL,
+        google_search_url: str = GOOGLE_SEARCH_URL,
+        cache: Optional[SearchCache] = None,
+    ):
+        self.apple_search_url = apple_search_url.rstrip('/')
+        self.google_search_url = google_search_url
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache if cache is not None else SearchCache()
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+    async def start(self):
+        """建立在應用程式生命週期內共用的 session"""
+        if self.session is None or self.session.closed:
+            self.session = self.create_session()
+            logger.info("AppSearchManager session 已建立")
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logger.info("AppSearchManager session 已關閉")
+        self.session = None
+
+    def apply_candidates(self, app_info: AppInfo, candidates: List, require_link: bool):
+        app_info.candidates = rank_candidates(app_info.search_term, candidates)
+        if app_info.candidates:
+            best = app_info.candidates[0]
+            app_info.name = best["name"]
+            app_info.link = best["link"]
+            # Google Play 需要有詳細頁連結才算找到
+            app_info.found = bool(best["link"]) if require_link else True
 
     async def search_apple_store(self, session: aiohttp.ClientSession, search_term: str) -> AppInfo:
-        base_url = f"https://www.apple.com/tw/search/{search_term}?src=serp"
+        base_url = f"{self.apple_search_url}/{search_term}?src=serp"
         app_info = AppInfo(platform="Apple App Store", search_term=search_term)
 
         try:
             async with session.get(base_url, headers=self.headers) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                    if product_block := soup.find('div', class_='rf-serp-product-description'):
-                        if name_tag := product_block.find('h2', class_='rf-serp-productname'):
-                            app_info.name = name_tag.get_text(strip=True)
-                            app_info.found = True
-                        if link_tag := product_block.find('a', href=True):
-                            app_info.link = link_tag['href']
+                    candidates = await run_parser(parse_apple_search, html, MAX_CANDIDATES)
+                    self.apply_candidates(app_info, candidates, require_link=False)
                 else:
+                    app_info._upstream_error = True
                     logger.warning(f"Apple Store returned status {response.status} for term '{search_term}'")
         except Exception as e:
+            app_info._upstream_error = True
             logger.error(f"Apple Store search error for term '{search_term}': {e}")
 
         return app_info
 
     async def search_google_play(self, session: aiohttp.ClientSession, search_term: str) -> AppInfo:
-        base_url = f"https://play.google.com/store/search?q={search_term}&c=apps&gl=TW&hl=zh_TW"
+        base_url = f"{self.google_search_url}?q={search_term}&c=apps&gl=TW&hl=zh_TW"
         app_info = AppInfo(platform="Google Play Store", search_term=search_term)
 
         try:
             async with session.get(base_url, headers=self.headers) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                    if name_div := soup.select_one('div.vWM94c'):
-                        app_name = name_div.text.strip()
-                        if app_name:
-                            app_info.name = app_name
-                            if link_element := soup.select_one('a[href*="/store/apps/details"]'):
-                                app_info.link = f"https://play.google.com{link_element['href']}&hl=zh_TW"
-                                app_info.found = True
-                    else:
-                        if name_div := soup.select_one('div.ubGTjb'):
-                            app_name = name_div.text.strip()
-                            if app_name:
-                                app_info.name = app_name
-                                if link_element := soup.select_one('a[href*="/store/apps/details"]'):
-                                    app_info.link = f"https://play.google.com{link_element['href']}&hl=zh_TW"
-                                    app_info.found = True
-
+                    candidates = await run_parser(parse_google_search, html, MAX_CANDIDATES)
+                    self.apply_candidates(app_info, candidates, require_link=True)
                 else:
+                    app_info._upstream_error = True
                     logger.warning(f"Google Play returned status {response.status} for term '{search_term}'")
         except Exception as e:
+            app_info._upstream_error = True
             logger.error(f"Google Play search error for term '{search_term}': {e}")
 
         return app_info
 
     async def search_all_platforms(self, search_terms: List[str]) -> List[Dict]:
-        results = []
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for term in search_terms:
-                tasks.append(self.search_apple_store(session, term))
-                tasks.append(self.search_google_play(session, term))
-            
-            search_results = await asyncio.gather(*tasks)
-            results = [result.dict() for result in search_results]
-
-        return results 
\ No newline at end of file
+        if self.session is None or self.session.closed:
+            # 未呼叫 start() 時（例如單獨使用此類別），使用一次性的 session
+            async with self.create_session() as session:
+                return await self._search_all_platforms(session, search_terms)
+        return await self._search_all_platforms(self.session, search_terms)
+
+    async def cached_search(self, search, session: aiohttp.ClientSession, search_term: str) -> AppInfo:
+        # 以正規化後的搜尋詞作為快取鍵，回傳時保留呼叫端原本的搜尋詞
+        app_info = await self.cache.get_or_fetch(
+            (search.__name__, normalize_term(search_term)),
+            lambda: search(session, search_term),
+            is_found=lambda result: result.found,
+            is_cacheable=lambda result: not result._upstream_error,
+        )
+        if app_info.search_term != search_term:
+            app_info = app_info.model_copy(update={"search_term": search_term})
+        return app_info
+
+    async def _search_all_platforms(self, session: aiohttp.ClientSession, search_terms: List[str]) -> List[Dict]:
+        tasks = []
+        for term in search_terms:
+            tasks.append(self.cached_search(self.search_apple_store, session, term))
+            tasks.append(self.cached_search(self.search_google_play, session, term))
+
+        search_results = await asyncio.gather(*tasks)
+        return [result.dict() for result in search_results] 
\ No newline at end of file
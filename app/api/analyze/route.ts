@@ -56,10 +56,17 @@ const requestQueue = new RequestQueue();
 // Hugging Face API 端點
 const SENTIMENT_MODEL_API = "https://api-inference.huggingface.co/models/jackietung/bert-base-chinese-finetuned-sentiment";
 const CATEGORY_MODEL_API = "https://api-inference.huggingface.co/models/jackietung/bert-base-chinese-finetuned-multi-classification";
+// 除了最高分的分類，另外保留分數達到此門檻的分類（例如 0.5）；未設定時只保留最高分的分類
+const CATEGORY_SCORE_THRESHOLD = Number(process.env.NEXT_PUBLIC_CATEGORY_SCORE_THRESHOLD || Infinity);
 
 // Hugging Face API 密鑰
 const HF_API_KEY = process.env.NEXT_PUBLIC_HUGGING_FACE_API_KEY || "";
 
+// 本機推論服務（inference-api 的 /api/v1/classify），設定後整份資料一次送出，不再逐則呼叫 Hugging Face API
+const INFERENCE_API_URL = process.env.NEXT_PUBLIC_INFERENCE_API_URL || "";
+// 推論服務每則評論的處理時間上限（毫秒），逾時後改用 Hugging Face API
+const INFERENCE_API_TIMEOUT_PER_ROW_MS = Number(process.env.NEXT_PUBLIC_INFERENCE_API_TIMEOUT_PER_ROW_MS) || 50;
+
 // 添加中文斷詞 API 配置
 const CHINESE_API_URL = process.env.NEXT_PUBLIC_CHINESE_API_URL || "https://chinese-nlp-api.onrender.com/api/v1/keywords";
 const CHINESE_API_KEY = process.env.NEXT_PUBLIC_CHINESE_API_KEY || "";
@@ -68,6 +75,32 @@ const CHINESE_API_KEY = process.env.NEXT_PUBLIC_CHINESE_API_KEY || "";
 const ENGLISH_API_URL = process.env.NEXT_PUBLIC_ENGLISH_API_URL || "https://english-nlp-api.onrender.com/api/v1/keywords";
 const ENGLISH_API_KEY = process.env.NEXT_PUBLIC_ENGLISH_API_KEY || "";
 
+// 中英文 NLP 閘道（例如 https://nlp-gateway.example.com/api/v1/keywords），設定後整份資料一次送出
+const NLP_GATEWAY_URL = process.env.NEXT_PUBLIC_NLP_GATEWAY_URL || "";
+// 閘道每則評論的處理時間上限（毫秒），逾時後改為逐則呼叫
+const NLP_GATEWAY_TIMEOUT_PER_ROW_MS = Number(process.env.NEXT_PUBLIC_NLP_GATEWAY_TIMEOUT_PER_ROW_MS) || 20;
+
+// 整批請求的逾時：固定的連線與啟動時間，加上依筆數增加的處理時間
+const BATCH_REQUEST_BASE_TIMEOUT_MS = 10000;
+function batchRequestTimeout(rowCount: number, perRowMs: number): number {
+  return BATCH_REQUEST_BASE_TIMEOUT_MS + rowCount * perRowMs;
+}
+
+// 評論內容與語言欄位的關鍵字
+const CONTENT_COLUMN_TERMS = [
+  '評論內容', '內容', 'content', 'comment',
+  'feedback', '評論', '意見', '建議'
+];
+const LANGUAGE_COLUMN_TERMS = ['語言', 'language', '語系'];
+
+// 尋找符合關鍵字的欄位值
+const findRowValue = (row: any, terms: string[]) => {
+  const foundKey = Object.keys(row).find(key =>
+    terms.some(term => key.toLowerCase().includes(term.toLowerCase()))
+  );
+  return foundKey ? row[foundKey] : null;
+};
+
 // 延遲函數
 const delay = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
 
@@ -154,7 +187,7 @@ async function analyzeCategory(text: string): Promise<string[]> {
       });
       
       console.log("選中的最高分數分類:", highestScore);
-      return [highestScore.label];
+      return selectCategories(result[0]);
     }
     console.log("分類分析結果格式不符合預期:", result);
     return ["未標記"]; // 默認分類
@@ -164,6 +197,50 @@ async function analyzeCategory(text: string): Promise<string[]> {
   }
 }
 
+// 從所有分類分數中選出標籤，Hugging Face 與本機推論服務兩條路徑共用
+function selectCategories(scores: { label: string; score: number }[]): string[] {
+  if (!Array.isArray(scores) || scores.length === 0) {
+    return ["未標記"];
+  }
+  const ranked = [...scores].sort((a, b) => b.score - a.score);
+  // 最高分的分類一定保留，其餘分類的分數需達到門檻
+  return [ranked[0], ...ranked.slice(1).filter(item => item.score >= CATEGORY_SCORE_THRESHOLD)]
+    .map(item => item.label);
+}
+
+// 透過本機推論服務一次取得所有評論的情感與分類
+async function classifyWithInferenceApi(
+  rows: any[]
+): Promise<{ sentiment: string; categories: string[] }[] | null> {
+  try {
+    const texts = rows.map(row => String(findRowValue(row, CONTENT_COLUMN_TERMS) || ''));
+    const response = await axios.post(
+      INFERENCE_API_URL,
+      // 回傳所有標籤，分類與 Hugging Face 路徑以相同規則選出
+      { texts, tasks: ['sentiment', 'category'] },
+      {
+        headers: { "Content-Type": "application/json" },
+        timeout: batchRequestTimeout(rows.length, INFERENCE_API_TIMEOUT_PER_ROW_MS)
+      }
+    );
+    if (!Array.isArray(response.data) || response.data.length !== rows.length) {
+      console.error("推論服務回應格式不符合預期:", response.data);
+      return null;
+    }
+    const validLabels = ["正面", "中性", "負面"];
+    return response.data.map((result: any) => {
+      const sentimentLabel = result.sentiment?.[0]?.label;
+      return {
+        sentiment: validLabels.includes(sentimentLabel) ? sentimentLabel : "未標記",
+        categories: selectCategories(result.category)
+      };
+    });
+  } catch (error) {
+    console.error("推論服務錯誤，改用 Hugging Face API:", error);
+    return null;
+  }
+}
+
 // 批次處理函數
 async function processBatch<T>(
   items: string[],
@@ -218,6 +295,31 @@ async function segmentText(text: string, language: string): Promise<string[]> {
   }
 }
 
+// 透過 NLP 閘道一次取得所有評論的關鍵詞，閘道依語言分派給中文或英文流程
+async function extractKeywordsWithGateway(rows: any[]): Promise<string[][] | null> {
+  try {
+    const texts = rows.map(row => String(findRowValue(row, CONTENT_COLUMN_TERMS) || ''));
+    // 沒有語言欄位時由閘道自動判斷
+    const languages = rows.map(row => findRowValue(row, LANGUAGE_COLUMN_TERMS) || null);
+    const response = await axios.post(
+      NLP_GATEWAY_URL,
+      { texts, languages, top_n: 10 },
+      {
+        headers: { "Content-Type": "application/json" },
+        timeout: batchRequestTimeout(rows.length, NLP_GATEWAY_TIMEOUT_PER_ROW_MS)
+      }
+    );
+    if (Array.isArray(response.data) && response.data.length === rows.length) {
+      return response.data.map((result: any) => result.keywords || []);
+    }
+    console.error("NLP 閘道回應格式不符合預期:", response.data);
+    return null;
+  } catch (error) {
+    console.error("NLP 閘道關鍵詞提取錯誤，改為逐則呼叫:", error);
+    return null;
+  }
+}
+
 export async function POST(request: NextRequest) {
   const encoder = new TextEncoder();
   const stream = new TransformStream();
@@ -445,6 +547,11 @@ export async function POST(request: NextRequest) {
         // 使用 Promise.all 處理所有行的異步操作
         const normalizedDataPromises = [];
         const batchSize = 5; // 每批處理 5 條評論
+
+        // 設定 NLP 閘道時先一次取得所有評論的關鍵詞，失敗時仍逐則呼叫中文或英文 API
+        const gatewayKeywords = NLP_GATEWAY_URL ? await extractKeywordsWithGateway(data) : null;
+        // 設定本機推論服務時先一次取得所有評論的情感與分類，失敗時仍逐則呼叫 Hugging Face API
+        const localInference = INFERENCE_API_URL ? await classifyWithInferenceApi(data) : null;
         
         for (let i = 0; i < data.length; i += batchSize) {
           const batch = data.slice(i, i + batchSize);
@@ -467,10 +574,7 @@ export async function POST(request: NextRequest) {
             const company = findColumn(companyTerms) || '未知';
 
             // 內容處理（必要欄位）
-            const contentTerms = [
-              '評論內容', '內容', 'content', 'comment', 
-              'feedback', '評論', '意見', '建議'
-            ];
+            const contentTerms = CONTENT_COLUMN_TERMS;
             const content = findColumn(contentTerms);
             if (!content && index === 0) {
               console.log('找不到評論內容欄位，可用欄位:', Object.keys(row));
@@ -514,7 +618,7 @@ export async function POST(request: NextRequest) {
             const device = findColumn(deviceTerms) || '未知';
 
             // 語言處理
-            const languageTerms = ['語言', 'language', '語系'];
+            const languageTerms = LANGUAGE_COLUMN_TERMS;
             const language = findColumn(languageTerms) || 'zh'; // 默認使用中文
 
             // 使用 Hugging Face 模型進行情感分析
@@ -525,7 +629,10 @@ export async function POST(request: NextRequest) {
             // 只有當內容存在且不為空時才進行分析
             if (content && content.trim()) {
               try {
-                if (HF_API_KEY && HF_API_KEY.length > 10) {
+                if (localInference) {
+                  sentiment = localInference[i + index].sentiment;
+                  categories = localInference[i + index].categories;
+                } else if (HF_API_KEY && HF_API_KEY.length > 10) {
                   try {
                     // 使用批次處理進行分析
                     const [sentimentResult, categoryResult] = await Promise.all([
@@ -575,7 +682,9 @@ export async function POST(request: NextRequest) {
             // 如果有內容，根據語言使用對應的斷詞 API
             if (content && content.trim()) {
               try {
-                const segmentedWords = await segmentText(content, language);
+                const segmentedWords = gatewayKeywords
+                  ? gatewayKeywords[i + index]
+                  : await segmentText(content, language);
                 // 合併現有關鍵詞和斷詞結果，去重
                 keywords = Array.from(new Set([...keywords, ...segmentedWords]));
               } catch (error) {
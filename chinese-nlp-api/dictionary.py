@@ -0,0 +1,133 @@
+"""
+停用詞與自訂詞典
+
+從 data/ 中的檔案載入停用詞（frozenset）與 jieba 自訂詞典，
+以兩個檔案內容的雜湊作為版本號。檔案更新後可透過管理端點或定期檢查重新載入，
+行程池中的 worker 會在收到新版本號的工作時自行從檔案重新載入。
+"""
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import jieba
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+STOPWORDS_FILE = os.environ.get('STOPWORDS_FILE', os.path.join(DATA_DIR, 'stopwords.txt'))
+USER_DICT_FILE = os.environ.get('USER_DICT_FILE', os.path.join(DATA_DIR, 'user_dict.txt'))
+# 檢查檔案是否變更的間隔（秒），0 表示不自動檢查
+DICTIONARY_POLL_INTERVAL = float(os.environ.get('DICTIONARY_POLL_INTERVAL', 30))
+
+# 詞語 -> (詞頻, 詞性)
+UserWords = Dict[str, Tuple[Optional[int], Optional[str]]]
+
+
+def _read_lines(path: str):
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def read_stopwords(path: str) -> FrozenSet[str]:
+    return frozenset(_read_lines(path))
+
+
+def read_user_dict(path: str) -> UserWords:
+    words: UserWords = {}
+    for line in _read_lines(path):
+        parts = line.split()
+        freq = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+        tag = parts[-1] if len(parts) > 1 and not parts[-1].isdigit() else None
+        words[parts[0]] = (freq, tag)
+    return words
+
+
+def _file_signature(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _file_digest(path: str) -> bytes:
+    if not path or not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+class Dictionary:
+    def __init__(self, stopwords_file: str = STOPWORDS_FILE, user_dict_file: str = USER_DICT_FILE):
+        self.stopwords_file = stopwords_file
+        self.user_dict_file = user_dict_file
+        self.stopwords: FrozenSet[str] = frozenset()
+        self.user_words: UserWords = {}
+        self.version = ''
+        self._mtimes: Tuple[Optional[float], Optional[float]] = (None, None)
+        self._requested_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.version)
+
+    def compute_version(self) -> str:
+        digest = hashlib.sha1(_file_digest(self.stopwords_file) + _file_digest(self.user_dict_file))
+        return digest.hexdigest()[:12]
+
+    def load(self) -> bool:
+        """從檔案重新載入，內容沒有改變時不做任何事；回傳是否更新"""
+        with self._lock:
+            mtimes = (_file_signature(self.stopwords_file), _file_signature(self.user_dict_file))
+            version = self.compute_version()
+            self._mtimes = mtimes
+            if version == self.version:
+                return False
+
+            user_words = read_user_dict(self.user_dict_file)
+            # 從詞典移除的詞降為詞頻 0，讓 jieba 不再把它當成一個詞
+            for word in self.user_words.keys() - user_words.keys():
+                jieba.del_word(word)
+            for word, (freq, tag) in user_words.items():
+                jieba.add_word(word, freq, tag)
+
+            self.user_words = user_words
+            self.stopwords = read_stopwords(self.stopwords_file)
+            self.version = version
+            logger.info(
+                f"詞典已載入 (version={version}, stopwords={len(self.stopwords)}, user_words={len(user_words)})"
+            )
+            return True
+
+    def reload_if_changed(self) -> bool:
+        """只比較檔案修改時間，有變更時才重新讀取"""
+        mtimes = (_file_signature(self.stopwords_file), _file_signature(self.user_dict_file))
+        if mtimes == self._mtimes:
+            return False
+        return self.load()
+
+    def sync(self, version: str):
+        """行程池 worker 收到與上次不同的版本號時，從檔案重新載入"""
+        if version == self.version or version == self._requested_version:
+            return
+        self._requested_version = version
+        self.load()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "stopwords": len(self.stopwords),
+            "user_words": len(self.user_words),
+            "stopwords_file": self.stopwords_file,
+            "user_dict_file": self.user_dict_file,
+        }
+
+
+dictionary = Dictionary()
@@ -0,0 +1,41 @@
+"""
+中文關鍵詞 IDF 模型
+
+模型本身位於共用的 common/idf_model.py，這裡以與 /keywords 相同的清理與分詞建立或更新模型。
+
+    python keyword_model.py build reviews.txt models/keywords
+    python keyword_model.py build reviews.csv models/keywords --column content
+    python keyword_model.py update new_reviews.txt models/keywords
+"""
+import argparse
+import os
+
+from idf_model import IdfModel, read_texts
+
+# 模型目錄，未設定或目錄不存在時所有詞的 IDF 皆為 1（與單一文件的 TF-IDF 相同）
+KEYWORD_MODEL_PATH = os.environ.get('KEYWORD_MODEL_PATH', '')
+
+# 服務中沿用原本的名稱
+KeywordModel = IdfModel
+
+
+def main():
+    from nlp import tokenize
+
+    parser = argparse.ArgumentParser(description="建立或更新關鍵詞 IDF 模型")
+    parser.add_argument('command', choices=['build', 'update'])
+    parser.add_argument('source', help='評論檔案（.txt 每行一則或 .csv）')
+    parser.add_argument('model_path', nargs='?', default=KEYWORD_MODEL_PATH or 'models/keywords')
+    parser.add_argument('--column', help='.csv 中的評論欄位，預設為第一欄')
+    args = parser.parse_args()
+
+    model = KeywordModel()
+    if args.command == 'update':
+        model.load(args.model_path, mmap=False)
+    added = model.update(tokenize(text) for text in read_texts(args.source, args.column))
+    model.save(args.model_path)
+    print(f"加入 {added} 則評論，模型共 {model.state.n_docs} 則、{len(model.state.vocab)} 個詞，已儲存至 {args.model_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,55 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from nlp import router as nlp_router
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
+import segmenter
+from dictionary import DICTIONARY_POLL_INTERVAL, dictionary
+from keyword_model import KEYWORD_MODEL_PATH
+from nlp import router as nlp_router, idf_model, result_cache, keyword_batcher, segment_batcher
+
+logger = logging.getLogger(__name__)
+
+async def poll_dictionary():
+    """定期檢查停用詞與自訂詞典檔案，有變更時自動重新載入"""
+    while True:
+        await asyncio.sleep(DICTIONARY_POLL_INTERVAL)
+        try:
+            await run_in_threadpool(dictionary.reload_if_changed)
+        except Exception as e:
+            logger.error(f"重新載入詞典失敗: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 預先載入 jieba 字典並啟動分詞行程池，避免第一個請求等待
+    segmenter.start()
+    # 啟動時以記憶體映射載入 IDF 模型，之後每次請求只需查表
+    if KEYWORD_MODEL_PATH and os.path.isdir(KEYWORD_MODEL_PATH):
+        idf_model.load(KEYWORD_MODEL_PATH)
+        logger.info(f"已載入關鍵詞模型 {KEYWORD_MODEL_PATH}: {idf_model.stats()}")
+    elif KEYWORD_MODEL_PATH:
+        # 目錄尚未建立時記下路徑，透過 API 加入的評論可以儲存到此處
+        idf_model.path = KEYWORD_MODEL_PATH
+        logger.warning(f"找不到關鍵詞模型 {KEYWORD_MODEL_PATH}，IDF 皆為 1")
+    result_cache.open()
+    keyword_batcher.start()
+    segment_batcher.start()
+    poll_task = asyncio.create_task(poll_dictionary()) if DICTIONARY_POLL_INTERVAL > 0 else None
+    yield
+    if poll_task is not None:
+        poll_task.cancel()
+    await keyword_batcher.stop()
+    await segment_batcher.stop()
+    segmenter.shutdown()
+    result_cache.close()
 
 app = FastAPI(
     title="Chinese NLP API",
     description="API for Chinese text processing including word segmentation and keyword extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置 CORS
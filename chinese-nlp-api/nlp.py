@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import jieba
-from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import List, Optional
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
+import json
 import re
+import segmenter
+from micro_batcher import MicroBatcher
+from dictionary import dictionary
+from keyword_model import KeywordModel
+from result_cache import ResultCache, cache_key
+from segmenter import segment_cache, segment_words
 
 router = APIRouter()
 
@@ -20,66 +28,121 @@ class KeywordResponse(BaseModel):
     keywords: List[str]
     word_scores: List[dict]
 
-# 停用詞列表（可以根據需要擴充）
-STOPWORDS = set(['的', '了', '和', '是', '就', '都', '而', '及', '與', '著',
-                '或', '一個', '沒有', '我們', '你們', '他們', '她們', '有些',
-                '也', '就是', '但是', '可以', '這個', '那個', '這些', '那些'])
+class CorpusUpdateRequest(BaseModel):
+    texts: List[str]
+    save: bool = False
+
+# 語料庫 IDF 模型，啟動時由 main.py 載入
+idf_model = KeywordModel()
+# 單一文本的關鍵詞結果快取
+result_cache = ResultCache()
+
+# 清理用的正規表示式只在載入模組時編譯一次
+URL_PATTERN = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+# 連續的非中文字元（標點、數字、英文、emoji、全形符號、空白），文本之間以 \x00 分隔
+NON_CJK = r'[^\u4e00-\u9fff\x00]'
+NON_CJK_PATTERN = re.compile(NON_CJK + '+')
+# 整段非中文字元都是 URL 時直接移除（兩側的中文相連）；其他含 URL 的片段本來就會被換成空格
+URL_ONLY_PATTERN = re.compile(f'(?<!{NON_CJK})(?:{URL_PATTERN})+(?!{NON_CJK})')
+TEXT_SEPARATOR = '\x00'
+
+def _clean_joined(text: str) -> str:
+    if 'http' in text:
+        text = URL_ONLY_PATTERN.sub('', text)
+    return NON_CJK_PATTERN.sub(' ', text)
 
 def clean_text(text: str) -> str:
-    """清理文本，移除特殊字符和多餘的空格"""
-    # 移除 URL
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # 移除特殊字符和數字
-    text = re.sub(r'[^\u4e00-\u9fff]+', ' ', text)
-    # 移除多餘的空格
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    """清理文本：移除 URL，其餘非中文字元合併為一個空格"""
+    # 純 ASCII 的文本不含中文，清理後必定為空
+    if text.isascii():
+        return ''
+    return clean_texts([text])[0]
 
-def extract_keywords(text: str, top_n: int = 5) -> KeywordResponse:
-    """從文本中提取關鍵詞"""
-    # 清理文本
+def clean_texts(texts: List[str]) -> List[str]:
+    """整批清理：以分隔字元串接後一次替換，不必對每則文本分別呼叫正規表示式"""
+    if not texts:
+        return []
+    joined = TEXT_SEPARATOR.join(texts)
+    if joined.count(TEXT_SEPARATOR) != len(texts) - 1:
+        # 文本本身含有分隔字元時逐則處理（該字元視為一般的非中文字元）
+        return [_clean_joined(text.replace(TEXT_SEPARATOR, ' ')).strip() for text in texts]
+    return [part.strip() for part in _clean_joined(joined).split(TEXT_SEPARATOR)]
+
+def tokenize(text: str) -> List[str]:
     cleaned_text = clean_text(text)
-    if not cleaned_text:
+    return segment_words(cleaned_text) if cleaned_text else []
+
+def batch_extract_keywords_vectorized(texts: List[str], top_n: int = 5) -> List[KeywordResponse]:
+    """整批清理、分詞後建立一個稀疏矩陣，分數同時考慮模型與本批次的文件頻率"""
+    cleaned_texts = clean_texts(texts)
+    if not all(cleaned_texts):
         raise HTTPException(status_code=400, detail="Text is empty after cleaning")
 
-    # 使用 jieba 進行分詞
-    words = list(jieba.cut(cleaned_text))
-    words = [w for w in words if w not in STOPWORDS and len(w) > 1]
-    
+    results = []
+    for top_words in idf_model.batch_top_n(segmenter.segment_texts(cleaned_texts), top_n):
+        word_scores = [{"word": word, "score": score} for word, score in top_words]
+        results.append(KeywordResponse(
+            keywords=[item["word"] for item in word_scores],
+            word_scores=word_scores
+        ))
+    return results
+
+def score_keywords(words: List[str], top_n: Optional[int] = 5) -> KeywordResponse:
     if not words:
         return KeywordResponse(keywords=[], word_scores=[])
 
-    # 為當前文本創建新的 TF-IDF 向量器
-    tfidf_vectorizer = TfidfVectorizer(
-        max_features=1000,
-        token_pattern=r"(?u)\b\w+\b"
-    )
-
-    # 使用當前文本訓練向量器
-    word_str = " ".join(words)
-    tfidf_vectorizer.fit([word_str])
-    tfidf_vector = tfidf_vectorizer.transform([word_str])
-    
-    # 獲取特徵名稱和分數
-    feature_names = tfidf_vectorizer.get_feature_names_out()
-    scores = tfidf_vector.toarray()[0]
-    
-    # 將詞語和分數配對並排序
+    # 詞頻乘上語料庫 IDF（未載入模型時 IDF 皆為 1）
     word_scores = [
-        {"word": word, "score": float(score)}
-        for word, score in zip(feature_names, scores)
-        if score > 0
+        {"word": word, "score": score}
+        for word, score in idf_model.score(words)[:top_n]
     ]
-    word_scores.sort(key=lambda x: x["score"], reverse=True)
-    
-    # 選取前 top_n 個關鍵詞
-    top_keywords = [item["word"] for item in word_scores[:top_n]]
-    
     return KeywordResponse(
-        keywords=top_keywords,
-        word_scores=word_scores[:top_n]
+        keywords=[item["word"] for item in word_scores],
+        word_scores=word_scores
     )
 
+def extract_keywords(text: str, top_n: int = 5) -> KeywordResponse:
+    """從文本中提取關鍵詞"""
+    # 清理文本
+    cleaned_text = clean_text(text)
+    if not cleaned_text:
+        raise HTTPException(status_code=400, detail="Text is empty after cleaning")
+
+    return score_keywords(segmenter.segment(cleaned_text), top_n)
+
+def keyword_cache_key(text: str, top_n: Optional[int]) -> bytes:
+    # 詞典或 IDF 模型更新後鍵會改變，舊的結果不會再被使用
+    return cache_key(text, top_n, f"{dictionary.version}:{idf_model.signature}")
+
+# (文本, top_n, 快取鍵)
+KeywordItem = Tuple[str, Optional[int], bytes]
+
+def extract_keywords_batch(items: List[KeywordItem]) -> List[Union[Dict, Exception]]:
+    """
+    多個單一文本請求合併處理：先查快取，未命中的文本整批清理與分詞後逐則計分。
+    每則結果與 extract_keywords 相同，清理後為空的文本回傳例外物件。
+    """
+    results: List[Union[Dict, Exception, None]] = [result_cache.get(key) for _, _, key in items]
+    missing = [i for i, result in enumerate(results) if result is None]
+    cleaned = dict(zip(missing, clean_texts([items[i][0] for i in missing])))
+    to_segment = [i for i in missing if cleaned[i]]
+    for i, words in zip(to_segment, segmenter.segment_texts([cleaned[i] for i in to_segment])):
+        _, top_n, key = items[i]
+        result = score_keywords(words, top_n).model_dump()
+        result_cache.set(key, result)
+        results[i] = result
+    for i in missing:
+        if not cleaned[i]:
+            results[i] = HTTPException(status_code=400, detail="Text is empty after cleaning")
+    return results
+
+def segment_batch(cleaned_texts: List[str]) -> List[List[str]]:
+    return segmenter.segment_texts(cleaned_texts)
+
+# 並行的單一文本請求合併成批次處理，啟動時由 main.py 啟動
+keyword_batcher = MicroBatcher(extract_keywords_batch)
+segment_batcher = MicroBatcher(segment_batch)
+
 @router.post("/segment", response_model=List[str])
 async def segment_text(request: TextRequest):
     """對文本進行分詞"""
@@ -88,21 +151,54 @@ async def segment_text(request: TextRequest):
         cleaned_text = clean_text(request.text)
         if not cleaned_text:
             raise HTTPException(status_code=400, detail="Text is empty after cleaning")
-        
-        # 使用 jieba 進行分詞
-        words = list(jieba.cut(cleaned_text))
-        # 過濾停用詞和單字詞
-        words = [w for w in words if w not in STOPWORDS and len(w) > 1]
-        
-        return words
+
+        # 與同時到達的請求合併後在執行緒中分詞，避免阻塞事件迴圈
+        return await segment_batcher.submit(cleaned_text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def stream_event(event_type: str, data) -> str:
+    return json.dumps({"type": event_type, "data": data}, ensure_ascii=False) + "\n"
+
+async def stream_segments(chunks: List[str]):
+    """各段平行分詞，依原本順序逐段送出；同時處理的段數限制在 worker 數的兩倍"""
+    window = max(1, segmenter.SEGMENT_WORKERS * 2)
+    pending = deque()
+    next_chunk = 0
+    total_words = 0
+    try:
+        for index in range(len(chunks)):
+            while next_chunk < len(chunks) and len(pending) < window:
+                pending.append(segmenter.submit(segment_words, chunks[next_chunk]))
+                next_chunk += 1
+            words = await pending.popleft()
+            total_words += len(words)
+            yield stream_event("words", {"chunk": index, "words": words})
+        yield stream_event("done", {"chunks": len(chunks), "words": total_words})
+    finally:
+        # 用戶端中途斷線時取消尚未開始的段落
+        for future in pending:
+            future.cancel()
+
+@router.post("/segment/stream")
+async def stream_segment_text(request: TextRequest):
+    """超長文本切成多段分詞，以 NDJSON 逐段回傳"""
+    cleaned_text = await run_in_threadpool(clean_text, request.text)
+    if not cleaned_text:
+        raise HTTPException(status_code=400, detail="Text is empty after cleaning")
+    chunks = segmenter.split_chunks(cleaned_text)
+    return StreamingResponse(stream_segments(chunks), media_type="application/x-ndjson")
+
 @router.post("/keywords", response_model=KeywordResponse)
 async def extract_text_keywords(request: TextRequest):
     """從文本中提取關鍵詞"""
     try:
-        return extract_keywords(request.text, request.top_n)
+        # 記憶體快取命中時直接回傳，不需要切換到執行緒
+        key = keyword_cache_key(request.text, request.top_n)
+        cached = result_cache.get_memory(key)
+        if cached is not None:
+            return cached
+        return await keyword_batcher.submit((request.text, request.top_n, key))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -110,10 +206,55 @@ async def extract_text_keywords(request: TextRequest):
 async def batch_extract_keywords(request: TextListRequest):
     """批量處理多個文本並提取關鍵詞"""
     try:
-        results = []
-        for text in request.texts:
-            result = extract_keywords(text, request.top_n)
-            results.append(result)
-        return results
+        return await run_in_threadpool(batch_extract_keywords_vectorized, request.texts, request.top_n)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/keyword-model")
+async def keyword_model_stats():
+    """查看目前載入的 IDF 模型"""
+    return idf_model.stats()
+
+@router.post("/keyword-model/documents")
+async def update_keyword_model(request: CorpusUpdateRequest):
+    """將新的評論加入 IDF 模型，save 為 true 時寫回模型目錄"""
+    try:
+        documents = await run_in_threadpool(segmenter.map_batch, tokenize, request.texts)
+        added = idf_model.update(documents)
+        if request.save:
+            idf_model.save()
+        return {"added": added, **idf_model.stats()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/admin/dictionary")
+async def dictionary_stats():
+    """查看目前的詞典版本與分詞快取"""
+    return {**dictionary.stats(), "segment_cache": segment_cache.stats()}
+
+@router.post("/admin/dictionary/reload")
+async def reload_dictionary():
+    """重新載入停用詞與自訂詞典檔案，不需要重新啟動服務或行程池"""
+    try:
+        reloaded = await run_in_threadpool(dictionary.load)
+        return {"reloaded": reloaded, **dictionary.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def result_cache_stats():
+    """關鍵詞結果快取與分詞快取的命中率"""
+    return {"keywords": result_cache.stats(), "segments": segment_cache.stats()}
+
+@router.get("/batching/stats")
+async def batching_stats():
+    """單一文本請求的微批次統計"""
+    return {"keywords": keyword_batcher.stats(), "segment": segment_batcher.stats()}
+
+@router.delete("/cache")
+async def clear_result_cache():
+    result_cache.clear()
+    segment_cache.clear()
+    return {"message": "快取已清除"}
@@ -0,0 +1,144 @@
+"""
+關鍵詞結果快取
+
+記憶體中的 LRU 加上 sqlite 檔案，鍵為 (文本雜湊, top_n, 詞典與模型版本)。
+重新上傳相同的 CSV 或重複爬取到相同評論時，不需要再清理、分詞與計算分數；
+sqlite 檔案在服務重新啟動後仍然有效。
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 50000))
+# sqlite 檔案路徑，未設定時只使用記憶體快取
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', '')
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_DISK_MAX_ENTRIES', 1000000))
+# 每寫入這麼多筆檢查一次檔案中的筆數
+_PRUNE_EVERY = 1000
+
+
+def cache_key(text: str, top_n: Optional[int], version: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{version}\x00{top_n}\x00".encode('utf-8'))
+    digest.update(text.encode('utf-8'))
+    return digest.digest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, path: str = RESULT_CACHE_PATH,
+                 disk_max_entries: int = RESULT_CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def open(self):
+        if not self.path or self._db is not None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+        logger.info(f"關鍵詞結果快取檔案 {self.path}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_memory(self, key: bytes) -> Optional[Any]:
+        """只查記憶體，可以直接在事件迴圈中呼叫"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+            return value
+
+    def get(self, key: bytes) -> Optional[Dict]:
+        """查記憶體後再查 sqlite；檔案中的結果會放回記憶體"""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        with self._lock:
+            row = None
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        value = json.loads(row[0])
+        self._remember(key, value)
+        return value
+
+    def set(self, key: bytes, value: Dict):
+        self._remember(key, value)
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune()
+
+    def _remember(self, key: bytes, value: Dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune(self):
+        # 檔案中的筆數超過上限時刪除最舊的結果
+        count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.disk_max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)", (excess,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] if self._db else 0
+        return {
+            "entries": len(self._entries),
+            "disk_entries": disk_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "path": self.path or None,
+        }
@@ -0,0 +1,186 @@
+"""
+jieba 分詞引擎
+
+啟動時預先載入字典（可指定預先建立的快取檔），大批次分散到行程池，
+並提供把超長文本切成多段的工具給串流分詞端點使用。
+分詞結果以文本雜湊與詞典版本為鍵快取，重複的文本不需要再分詞。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import jieba
+
+from dictionary import dictionary
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+logger = logging.getLogger(__name__)
+
+# 主字典（例如繁體中文的 dict.txt.big），未設定時使用 jieba 內建字典
+JIEBA_DICTIONARY = os.environ.get('JIEBA_DICTIONARY', '')
+# 字典快取檔，映像建置時預先產生可省去啟動時建立前綴字典的時間
+JIEBA_CACHE_FILE = os.environ.get('JIEBA_CACHE_FILE', '')
+SEGMENT_WORKERS = int(os.environ.get('SEGMENT_WORKERS', os.cpu_count() or 1))
+# 批次達到此數量時才使用行程池，小批次直接在目前行程處理
+PARALLEL_BATCH_SIZE = int(os.environ.get('PARALLEL_BATCH_SIZE', 200))
+# 串流分詞時每段的字元數上限
+STREAM_CHUNK_SIZE = int(os.environ.get('SEGMENT_STREAM_CHUNK_SIZE', 2000))
+SEGMENT_CACHE_SIZE = int(os.environ.get('SEGMENT_CACHE_SIZE', 10000))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class SegmentCache:
+    """分詞結果的 LRU 快取，鍵為 (詞典版本, 文本雜湊)"""
+
+    def __init__(self, max_entries: int = SEGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(cleaned_text: str) -> Tuple[str, bytes]:
+        return dictionary.version, hashlib.blake2b(cleaned_text.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[List[str]]:
+        with self._lock:
+            words = self._entries.get(key)
+            if words is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return words
+
+    def set(self, key: Tuple[str, bytes], words: List[str]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = words
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+segment_cache = SegmentCache()
+
+
+def initialize():
+    """載入 jieba 字典與自訂詞典；行程池中的每個 worker 也會執行一次"""
+    if not jieba.dt.initialized:
+        if JIEBA_DICTIONARY:
+            jieba.set_dictionary(JIEBA_DICTIONARY)
+        if JIEBA_CACHE_FILE:
+            jieba.dt.cache_file = os.path.abspath(JIEBA_CACHE_FILE)
+            jieba.dt.tmp_dir = os.path.dirname(jieba.dt.cache_file)
+        started = time.perf_counter()
+        jieba.initialize()
+        logger.info(f"jieba 字典載入完成 ({time.perf_counter() - started:.2f}s)")
+    if not dictionary.loaded:
+        dictionary.load()
+
+
+def segment_words(cleaned_text: str) -> List[str]:
+    """使用 jieba 分詞並過濾停用詞和單字詞"""
+    stopwords = dictionary.stopwords
+    return [w for w in jieba.cut(cleaned_text) if w not in stopwords and len(w) > 1]
+
+
+def _run_synced(func: Callable[[T], R], version: str, item: T) -> R:
+    # 在 worker 中執行：詞典版本與主行程不同時先重新載入
+    dictionary.sync(version)
+    return func(item)
+
+
+def _ready() -> bool:
+    return True
+
+
+def start():
+    """在目前行程載入字典，並預先啟動行程池的所有 worker"""
+    global _pool
+    initialize()
+    if SEGMENT_WORKERS > 1 and _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=SEGMENT_WORKERS, initializer=initialize)
+        # ProcessPoolExecutor 會在送出工作時才建立 worker，先送出空工作讓第一個請求不必等待
+        for future in [_pool.submit(_ready) for _ in range(SEGMENT_WORKERS)]:
+            future.result()
+        logger.info(f"分詞行程池已啟動 ({SEGMENT_WORKERS} workers)")
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def map_batch(func: Callable[[T], R], items: List[T]) -> List[R]:
+    """整批處理，大批次分散到行程池（jieba 為純 Python，執行緒無法平行）"""
+    if _pool is None or len(items) < PARALLEL_BATCH_SIZE:
+        return [func(item) for item in items]
+    chunksize = max(1, len(items) // (SEGMENT_WORKERS * 4))
+    return list(_pool.map(partial(_run_synced, func, dictionary.version), items, chunksize=chunksize))
+
+
+def segment_texts(cleaned_texts: List[str]) -> List[List[str]]:
+    """整批分詞，先查快取，只有未命中的文本才實際分詞"""
+    keys = [segment_cache.key(text) for text in cleaned_texts]
+    results: List[Optional[List[str]]] = [segment_cache.get(key) for key in keys]
+    missing = [i for i, words in enumerate(results) if words is None]
+    if missing:
+        for i, words in zip(missing, map_batch(segment_words, [cleaned_texts[i] for i in missing])):
+            segment_cache.set(keys[i], words)
+            results[i] = words
+    return results
+
+
+def segment(cleaned_text: str) -> List[str]:
+    return segment_texts([cleaned_text])[0]
+
+
+def submit(func: Callable[[T], R], item: T) -> "asyncio.Future[R]":
+    """送出單一工作：有行程池時在行程池執行，否則在執行緒中執行"""
+    loop = asyncio.get_running_loop()
+    if _pool is None:
+        return loop.run_in_executor(None, func, item)
+    future: Future = _pool.submit(_run_synced, func, dictionary.version, item)
+    return asyncio.wrap_future(future, loop=loop)
+
+
+def split_chunks(cleaned_text: str, chunk_size: int = STREAM_CHUNK_SIZE) -> List[str]:
+    """在空白處（清理前的標點與非中文字元）切段，單一連續中文超過上限時才直接截斷"""
+    chunks = []
+    while len(cleaned_text) > chunk_size:
+        cut = cleaned_text.rfind(' ', 0, chunk_size + 1)
+        if cut <= 0:
+            cut = chunk_size
+        chunks.append(cleaned_text[:cut].strip())
+        cleaned_text = cleaned_text[cut:].lstrip()
+    if cleaned_text:
+        chunks.append(cleaned_text)
+    return chunks
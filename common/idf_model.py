@@ -0,0 +1,238 @@
+"""
+語料庫層級的 IDF 模型
+
+以儲存的評論建立詞彙表與文件頻率（df），存成 vocab.json 與 df.npy，
+啟動時以記憶體映射載入，之後可以持續加入新的評論。
+模型只處理已分詞的文件，chinese-nlp-api（jieba 分詞）與 english-nlp-api（unigram 與 bigram）共用。
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+VOCAB_FILE = 'vocab.json'
+DF_FILE = 'df.npy'
+
+
+class ModelState(NamedTuple):
+    vocab: Dict[str, int]
+    df: np.ndarray
+    n_docs: int
+    # 模型內容的雜湊，見 content_signature
+    signature: str = ''
+
+
+def content_signature(vocab: Dict[str, int], df: np.ndarray, n_docs: int) -> str:
+    """以文件數、排序後的詞彙與對應的 df 計算雜湊，內容相同的模型才會得到相同的值"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{n_docs}\x00".encode('utf-8'))
+    words = sorted(vocab)
+    digest.update('\x00'.join(words).encode('utf-8'))
+    indices = np.fromiter((vocab[word] for word in words), dtype=np.int64, count=len(words))
+    digest.update(np.ascontiguousarray(np.asarray(df, dtype=np.int64)[indices]).tobytes())
+    return digest.hexdigest()
+
+
+def make_state(vocab: Dict[str, int], df: np.ndarray, n_docs: int) -> ModelState:
+    return ModelState(vocab, df, n_docs, content_signature(vocab, df, n_docs))
+
+
+def _empty_state() -> ModelState:
+    return make_state({}, np.zeros(0, dtype=np.int64), 0)
+
+
+class IdfModel:
+    """保存詞彙表與文件頻率，計算與 scikit-learn smooth_idf 相同的 IDF"""
+
+    def __init__(self):
+        self._state = _empty_state()
+        self._lock = threading.Lock()
+        self.path: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._state.n_docs > 0
+
+    @property
+    def signature(self) -> str:
+        """模型內容的雜湊，換成其他模型或加入評論後都會改變，供結果快取使用"""
+        return self._state.signature
+
+    @property
+    def state(self) -> ModelState:
+        return self._state
+
+    def load(self, path: str, mmap: bool = True):
+        with open(os.path.join(path, VOCAB_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        df = np.load(os.path.join(path, DF_FILE), mmap_mode='r' if mmap else None)
+        if len(df) != len(meta['vocab']):
+            raise ValueError(f"{DF_FILE} 與 {VOCAB_FILE} 的詞彙數量不一致")
+        self._state = make_state(meta['vocab'], df, int(meta['n_docs']))
+        self.path = path
+
+    def save(self, path: Optional[str] = None):
+        """先寫入暫存檔再取代，避免其他行程讀到寫到一半的檔案"""
+        path = path or self.path
+        if not path:
+            raise ValueError("未指定模型路徑")
+        os.makedirs(path, exist_ok=True)
+        state = self._state
+
+        df_tmp = os.path.join(path, DF_FILE + '.tmp')
+        with open(df_tmp, 'wb') as f:
+            np.save(f, np.asarray(state.df, dtype=np.int64))
+        vocab_tmp = os.path.join(path, VOCAB_FILE + '.tmp')
+        with open(vocab_tmp, 'w', encoding='utf-8') as f:
+            json.dump({"n_docs": state.n_docs, "vocab": state.vocab}, f, ensure_ascii=False)
+
+        os.replace(df_tmp, os.path.join(path, DF_FILE))
+        os.replace(vocab_tmp, os.path.join(path, VOCAB_FILE))
+        self.path = path
+
+    def update(self, documents: Iterable[List[str]]) -> int:
+        """加入已分詞（或已切成 n-gram）的文件，回傳加入的文件數；新的狀態一次替換，不影響進行中的查詢"""
+        doc_freq: Counter = Counter()
+        added = 0
+        for words in documents:
+            doc_freq.update(set(words))
+            added += 1
+        if not added:
+            return 0
+
+        with self._lock:
+            state = self._state
+            vocab = dict(state.vocab)
+            for word in doc_freq:
+                if word not in vocab:
+                    vocab[word] = len(vocab)
+            df = np.zeros(len(vocab), dtype=np.int64)
+            df[:len(state.df)] = state.df
+            indices = np.fromiter((vocab[word] for word in doc_freq), dtype=np.int64, count=len(doc_freq))
+            df[indices] += np.fromiter(doc_freq.values(), dtype=np.int64, count=len(doc_freq))
+            self._state = make_state(vocab, df, state.n_docs + added)
+        return added
+
+    def idf(self, words: List[str]) -> np.ndarray:
+        """idf = ln((1 + N) / (1 + df)) + 1；沒有模型時全部為 1"""
+        state = self._state
+        if not state.n_docs:
+            return np.ones(len(words))
+        doc_freq = np.fromiter(
+            (state.df[state.vocab[word]] if word in state.vocab else 0 for word in words),
+            dtype=np.float64, count=len(words),
+        )
+        return np.log((1 + state.n_docs) / (1 + doc_freq)) + 1
+
+    def score(self, words: List[str]) -> List[Tuple[str, float]]:
+        """以詞頻乘上 IDF 並做 L2 正規化，依分數由高到低、同分依詞排序"""
+        counts = Counter(words)
+        if not counts:
+            return []
+        vocab = list(counts)
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(vocab)) * self.idf(vocab)
+        norm = math.sqrt(float(np.dot(weights, weights)))
+        if norm:
+            weights /= norm
+        return sorted(zip(vocab, weights.tolist()), key=lambda item: (-item[1], item[0]))
+
+    def batch_matrix(self, documents: List[List[str]]) -> Tuple[sparse.csr_matrix, List[str]]:
+        """整批文件建立一個 CSR 矩陣（列為文件、欄為批次詞彙），值為 L2 正規化的 tf-idf
+
+        文件頻率為模型的 df 加上本批次的 df，文件數同樣包含本批次。
+        """
+        columns: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for words in documents:
+            for word, count in Counter(words).items():
+                indices.append(columns.setdefault(word, len(columns)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        vocab = list(columns)
+        indices_array = np.asarray(indices, dtype=np.int64)
+        matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), indices_array, np.asarray(indptr, dtype=np.int64)),
+            shape=(len(documents), len(vocab)),
+        )
+
+        state = self._state
+        batch_df = np.bincount(indices_array, minlength=len(vocab))
+        model_df = np.fromiter(
+            (state.df[state.vocab[word]] if word in state.vocab else 0 for word in vocab),
+            dtype=np.float64, count=len(vocab),
+        )
+        n_docs = state.n_docs + len(documents)
+        idf = np.log((1 + n_docs) / (1 + model_df + batch_df)) + 1
+
+        matrix.data *= idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+        return matrix, vocab
+
+    def batch_top_n(self, documents: List[List[str]], top_n: Optional[int] = 5) -> List[List[Tuple[str, float]]]:
+        """每份文件取分數最高的 top_n 個詞，排序規則與 score() 相同（分數由高到低、同分依詞排序）"""
+        if not documents:
+            return []
+        matrix, vocab = self.batch_matrix(documents)
+        lengths = np.diff(matrix.indptr)
+        width = int(lengths.max()) if len(lengths) else 0
+        k = width if top_n is None else max(0, min(top_n, width))
+        if k == 0:
+            return [[] for _ in documents]
+
+        # 補齊成 (文件數, 最長文件詞數) 的矩陣，空位分數為 -inf
+        filled = np.arange(width) < lengths[:, None]
+        scores = np.full((len(documents), width), -np.inf)
+        scores[filled] = matrix.data
+        columns = np.zeros((len(documents), width), dtype=np.int64)
+        columns[filled] = matrix.indices
+
+        # 第 k 高的分數作為門檻，保留所有同分的詞，才能依詞排序決定名次
+        threshold = np.partition(scores, width - k, axis=1)[:, width - k]
+        keep = scores >= threshold[:, None]
+        kept = int(keep.sum(axis=1).max())
+        candidates = np.argpartition(~keep, kept - 1, axis=1)[:, :kept]
+        candidate_scores = np.take_along_axis(np.where(keep, scores, -np.inf), candidates, axis=1)
+        candidate_columns = np.take_along_axis(columns, candidates, axis=1)
+
+        word_rank = np.empty(len(vocab), dtype=np.int64)
+        word_rank[sorted(range(len(vocab)), key=vocab.__getitem__)] = np.arange(len(vocab))
+        order = np.lexsort((word_rank[candidate_columns], -candidate_scores), axis=1)[:, :k]
+        top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        top_columns = np.take_along_axis(candidate_columns, order, axis=1)
+
+        results = []
+        for row_scores, row_columns, length in zip(top_scores.tolist(), top_columns.tolist(), lengths.tolist()):
+            count = min(k, length)
+            results.append([(vocab[column], score) for column, score in zip(row_columns[:count], row_scores[:count])])
+        return results
+
+    def stats(self) -> Dict:
+        state = self._state
+        return {
+            "loaded": self.loaded,
+            "path": self.path,
+            "n_docs": state.n_docs,
+            "vocab_size": len(state.vocab),
+            "signature": state.signature,
+        }
+
+
+def read_texts(filename: str, column: Optional[str] = None) -> List[str]:
+    """讀取評論：.csv 取指定欄位，其他格式每行一則"""
+    if filename.endswith('.csv'):
+        import pandas as pd
+        frame = pd.read_csv(filename)
+        return frame[column or frame.columns[0]].dropna().astype(str).tolist()
+    with open(filename, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
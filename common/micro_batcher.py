@@ -0,0 +1,173 @@
+"""
+微批次
+
+並行請求的項目先放進佇列，由單一工作迴圈把 max_wait_ms 毫秒內（最多 max_batch_size 筆）
+收集到的項目組成一批，在執行緒中一次處理，再把每個項目的結果交回對應的請求。
+chinese-nlp-api、english-nlp-api 與 inference-api 共用這個實作，
+部署時把此目錄加進 PYTHONPATH（各服務的 Dockerfile 放在 /opt/common）。
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# 0 表示不合併，每個請求各自處理
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', 2))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+
+
+class MicroBatcher(Generic[T, R]):
+    """func 接收一批項目，依序回傳每個項目的結果；個別項目失敗時回傳例外物件
+
+    dedicated_thread 為 True 時以自己的單一執行緒處理（適合本身會多執行緒運算的模型），
+    否則使用共用的執行緒池。
+    """
+
+    def __init__(self, func: Callable[[List[T]], List[Union[R, Exception]]],
+                 max_batch_size: int = MICRO_BATCH_MAX_SIZE, max_wait_ms: float = MICRO_BATCH_WAIT_MS,
+                 dedicated_thread: bool = False):
+        self.func = func
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.dedicated_thread = dedicated_thread
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 工作迴圈正在處理的一批，停止時需要通知這些請求
+        self._current: List[Tuple[T, asyncio.Future]] = []
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch_size > 1
+
+    def start(self):
+        if self.dedicated_thread and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        if self.enabled and self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # 正在處理與仍在佇列中的請求不會再有結果，直接以錯誤結束，避免關閉時卡住
+            pending = [future for _, future in self._current]
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait()[1])
+            for future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("服務正在關閉，請求未處理"))
+            self._current = []
+            self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, item: T) -> R:
+        return (await self.submit_many([item]))[0]
+
+    async def submit_many(self, items: Sequence[T], sort_key: Optional[Callable[[T], Any]] = None) -> List[R]:
+        """送出一個請求的所有項目，依原本順序回傳結果
+
+        sort_key 決定項目放進佇列的順序，例如依文本長度排序，讓同一批的項目相近。
+        """
+        order = list(range(len(items)))
+        if sort_key is not None:
+            order.sort(key=lambda i: sort_key(items[i]))
+        if self._task is None:
+            # 未啟用微批次時直接處理，每批仍不超過 max_batch_size 筆
+            results: List[Any] = [None] * len(items)
+            for start in range(0, len(order), self.max_batch_size):
+                chunk = order[start:start + self.max_batch_size]
+                for i, result in zip(chunk, await self._process([items[i] for i in chunk])):
+                    results[i] = result
+        else:
+            loop = asyncio.get_running_loop()
+            futures = [loop.create_future() for _ in items]
+            for i in order:
+                self._queue.put_nowait((items[i], futures[i]))
+            try:
+                results = await asyncio.gather(*futures)
+            except BaseException:
+                # 用戶端中途斷線時，其餘尚未處理的項目不再送進 func
+                for future in futures:
+                    future.cancel()
+                raise
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    async def _process(self, items: List[T]) -> List[Union[R, Exception]]:
+        started = time.perf_counter()
+        try:
+            if self._executor is not None:
+                results = await asyncio.get_running_loop().run_in_executor(self._executor, self.func, items)
+            else:
+                results = await run_in_threadpool(self.func, items)
+        except Exception as e:
+            results = [e] * len(items)
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+        if len(results) != len(items):
+            # 結果數量不符時無法對應到請求，整批視為失敗，每個請求都會收到回應
+            error = RuntimeError(f"func 回傳 {len(results)} 個結果，但這一批有 {len(items)} 個項目")
+            results = [error] * len(items)
+        self.batches += 1
+        self.items += len(items)
+        return results
+
+    async def _collect(self) -> List[Tuple[T, asyncio.Future]]:
+        # 直接收集到 _current，等待下一個項目時被停止也能找到已取出的請求
+        self._current = batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 用戶端已斷線的請求不再處理
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            results = await self._process([item for item, _ in batch])
+            self._current = []
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
@@ -0,0 +1,61 @@
+"""
+Corpus-level IDF model for English keyword extraction.
+
+Document frequencies of unigrams and bigrams from the stored review corpus
+are kept by the shared common/idf_model.py (vocab.json + df.npy, memory-mapped
+at startup and extendable with new reviews), so single-text requests are
+scored against real corpus statistics without fitting a vectorizer.
+
+    python corpus_model.py build reviews.txt models/english
+    python corpus_model.py build reviews.csv models/english --column content
+    python corpus_model.py update new_reviews.txt models/english
+"""
+import argparse
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from idf_model import IdfModel, read_texts
+
+ENGLISH_KEYWORD_MODEL_PATH = os.environ.get('ENGLISH_KEYWORD_MODEL_PATH', '')
+
+# Same preprocessing, stopwords and n-grams as the per-request TfidfVectorizer
+analyze = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).build_analyzer()
+
+
+class CorpusIdfModel(IdfModel):
+    """IdfModel fed with raw review texts, split into terms by the vectorizer's analyzer."""
+
+    def update(self, texts: Iterable[str]) -> int:
+        """Add raw review texts to the corpus and return how many were added."""
+        return super().update(analyze(text) for text in texts)
+
+    def keywords(self, text: str, max_features: Optional[int] = 10) -> Tuple[List[str], List[float]]:
+        """Top max_features terms of one text by L2-normalized tf-idf, highest score first."""
+        terms = analyze(text)
+        if not terms:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        ranked = self.score(terms)[:max_features]
+        return [term for term, _ in ranked], [score for _, score in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the English keyword IDF model")
+    parser.add_argument('command', choices=['build', 'update'])
+    parser.add_argument('source', help='review file (.txt with one review per line, or .csv)')
+    parser.add_argument('model_path', nargs='?', default=ENGLISH_KEYWORD_MODEL_PATH or 'models/english')
+    parser.add_argument('--column', help='review column of a .csv file (default: first column)')
+    args = parser.parse_args()
+
+    model = CorpusIdfModel()
+    if args.command == 'update':
+        model.load(args.model_path, mmap=False)
+    added = model.update(read_texts(args.source, args.column))
+    model.save(args.model_path)
+    print(f"Added {added} reviews; model has {model.state.n_docs} reviews and "
+          f"{len(model.state.vocab)} terms, saved to {args.model_path}")
+
+
+if __name__ == "__main__":
+    main()
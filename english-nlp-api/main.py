@@ -1,12 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any, Tuple
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
+from scipy import sparse
+import io
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
 from sklearn.feature_extraction.text import TfidfVectorizer
+from nltk_resources import resources
+import review_tokenizer
+from micro_batcher import MicroBatcher
+from corpus_model import CorpusIdfModel, ENGLISH_KEYWORD_MODEL_PATH
 import os
 
 app = FastAPI(
@@ -43,101 +47,239 @@ class BatchKeywordsResponse(BaseModel):
     keywords: List[str]
     tfidf_matrix: List[List[float]]
 
-@app.on_event("startup")
-async def startup_event():
-    try:
-        nltk.download('punkt')
-        nltk.download('stopwords')
-        nltk.download('averaged_perceptron_tagger')
-        nltk.download('wordnet')
-        nltk.download('omw-1.4')
-    except Exception as e:
-        print(f"Error downloading NLTK resources: {e}")
+class DocumentKeywords(BaseModel):
+    keywords: List[str]
+    scores: List[float]
 
-def process_single_text(text: str) -> Dict[str, Any]:
-    stop_words = set(stopwords.words('english'))
-    lemmatizer = WordNetLemmatizer()
+class BatchTopKResponse(BaseModel):
+    documents: List[DocumentKeywords]
 
-    # Tokenization
-    tokens = word_tokenize(text)
+class CorpusUpdateInput(BaseModel):
+    texts: List[str]
+    save: bool = False
 
-    # Basic cleaning: remove stopwords and non-alphabetic tokens
-    filtered_tokens = [
-        token.lower()
-        for token in tokens
-        if token.lower() not in stop_words and token.isalpha()
-    ]
+# Corpus IDF model used by /api/v1/keywords when loaded
+corpus_model = CorpusIdfModel()
 
-    # Lemmatization
-    lemmas = [lemmatizer.lemmatize(token) for token in filtered_tokens]
+@app.on_event("startup")
+async def startup_event():
+    # Load bundled corpora once and pre-warm the lemmatizer and tagger.
+    # A missing resource aborts startup instead of failing on the first request.
+    resources.load()
+    print(f"NLTK resources loaded in {resources.load_seconds:.2f}s")
+    review_tokenizer.start()
+    if ENGLISH_KEYWORD_MODEL_PATH and os.path.isdir(ENGLISH_KEYWORD_MODEL_PATH):
+        corpus_model.load(ENGLISH_KEYWORD_MODEL_PATH)
+        print(f"Keyword model loaded: {corpus_model.stats()}")
+    elif ENGLISH_KEYWORD_MODEL_PATH:
+        # Reviews added through the API can still be saved here
+        corpus_model.path = ENGLISH_KEYWORD_MODEL_PATH
 
-    # POS tagging
-    pos_tags = nltk.pos_tag(filtered_tokens)
+    keyword_batcher.start()
+    segment_batcher.start()
 
-    return {
-        'tokens': filtered_tokens,
-        'lemmas': lemmas,
-        'pos_tags': pos_tags
-    }
+@app.on_event("shutdown")
+async def shutdown_event():
+    await keyword_batcher.stop()
+    await segment_batcher.stop()
+    review_tokenizer.shutdown()
 
-def extract_keywords_tfidf(texts: List[str] | str, max_features: int = 10):
+def process_single_text(text: str) -> Dict[str, Any]:
+    # Tokenization, stopword filtering, cached lemmatization and POS tagging
+    return review_tokenizer.process_texts([text])[0]
+
+def fit_tfidf(texts: List[str], max_features: Optional[int] = 10) -> Tuple[np.ndarray, sparse.csr_matrix]:
     vectorizer = TfidfVectorizer(
-        max_features=max_features,
+        max_features=max_features if max_features and max_features > 0 else None,
         stop_words='english',
         ngram_range=(1, 2)
     )
-    
+    tfidf_matrix = vectorizer.fit_transform(texts)
+    return vectorizer.get_feature_names_out(), tfidf_matrix.tocsr()
+
+def extract_keywords_tfidf(texts: List[str] | str, max_features: int = 10):
     # Handle single text vs multiple texts
     if isinstance(texts, str):
         texts = [texts]
-    
-    tfidf_matrix = vectorizer.fit_transform(texts)
-    feature_names = vectorizer.get_feature_names_out()
-    
+
+    feature_names, tfidf_matrix = fit_tfidf(texts, max_features)
+
     # Get the TF-IDF scores
     scores = tfidf_matrix.toarray()[0] if len(texts) == 1 else tfidf_matrix.toarray()
-    
+
     return feature_names, scores
 
+def top_k_per_row(feature_names: np.ndarray, tfidf_matrix: sparse.csr_matrix, top_k: int) -> List[DocumentKeywords]:
+    """
+    Highest-scoring terms of each document, read directly from the CSR rows.
+    Ties are ordered by term.
+    """
+    documents = []
+    for row in range(tfidf_matrix.shape[0]):
+        start, end = tfidf_matrix.indptr[row], tfidf_matrix.indptr[row + 1]
+        data = tfidf_matrix.data[start:end]
+        columns = tfidf_matrix.indices[start:end]
+        if len(data) > top_k:
+            # Keep every term tied with the k-th score so ties are resolved by term
+            kth = -np.partition(-data, top_k - 1)[top_k - 1]
+            selected = data >= kth
+            data, columns = data[selected], columns[selected]
+        ranked = sorted(zip(data.tolist(), feature_names[columns].tolist()), key=lambda item: (-item[0], item[1]))[:top_k]
+        documents.append(DocumentKeywords(
+            keywords=[term for _, term in ranked],
+            scores=[score for score, _ in ranked]
+        ))
+    return documents
+
+def keywords_for_text(text: str, max_features: int = 10) -> KeywordsResponse:
+    # With a corpus model terms are scored against corpus IDF and returned by score;
+    # otherwise a vectorizer is fitted on the text alone.
+    if corpus_model.loaded:
+        keywords, scores = corpus_model.keywords(text, max_features)
+        return KeywordsResponse(keywords=keywords, scores=scores)
+    keywords, scores = extract_keywords_tfidf(text, max_features)
+    return KeywordsResponse(
+        keywords=keywords.tolist(),
+        scores=scores.tolist()
+    )
+
+def extract_keywords_batch(items: List[Tuple[str, int]]) -> List[Union[KeywordsResponse, Exception]]:
+    """
+    Keywords for several single-text requests in one threadpool call.
+    A failing text returns its exception so the other requests are unaffected.
+    """
+    results = []
+    for text, max_features in items:
+        try:
+            results.append(keywords_for_text(text, max_features))
+        except Exception as e:
+            results.append(e)
+    return results
+
+# Concurrent single-text requests are coalesced into batches; started with the app
+keyword_batcher = MicroBatcher(extract_keywords_batch)
+segment_batcher = MicroBatcher(review_tokenizer.process_texts)
+
+def csr_to_npz(feature_names: np.ndarray, tfidf_matrix: sparse.csr_matrix) -> bytes:
+    """
+    Serialize in the scipy.sparse.save_npz layout plus a feature_names array,
+    so clients can read it with scipy.sparse.load_npz or numpy.load.
+    """
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        format=np.array(b'csr'),
+        shape=np.array(tfidf_matrix.shape),
+        data=tfidf_matrix.data,
+        indices=tfidf_matrix.indices,
+        indptr=tfidf_matrix.indptr,
+        feature_names=feature_names.astype(str),
+    )
+    return buffer.getvalue()
+
 @app.post("/api/v1/segment", response_model=SegmentResponse)
 async def segment_text(input_data: TextInput):
     """
     Segment a single text into tokens, with lemmatization and POS tagging.
+    Concurrent requests are tagged together in one batch.
     """
     try:
-        result = process_single_text(input_data.text)
+        result = await segment_batcher.submit(input_data.text)
         return SegmentResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/batch-segment", response_model=List[SegmentResponse])
+async def batch_segment_text(input_data: BatchTextInput):
+    """
+    Segment multiple texts in one request. Texts are tagged in batched calls,
+    lemmas are cached per token and large batches are split across worker processes.
+    """
+    try:
+        return await run_in_threadpool(review_tokenizer.process_batch, input_data.texts)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/v1/keywords", response_model=KeywordsResponse)
 async def extract_keywords(input_data: TextInput, max_features: int = 10):
     """
     Extract keywords from a single text using TF-IDF.
+    With a corpus model loaded, terms are scored against corpus IDF and returned by score;
+    otherwise a vectorizer is fitted on the text alone.
     """
     try:
-        keywords, scores = extract_keywords_tfidf(input_data.text, max_features)
-        return KeywordsResponse(
-            keywords=keywords.tolist(),
-            scores=scores.tolist()
-        )
+        return await keyword_batcher.submit((input_data.text, max_features))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/v1/batch-keywords", response_model=BatchKeywordsResponse)
-async def batch_extract_keywords(input_data: BatchTextInput, max_features: int = 10):
+@app.post("/api/v1/batch-keywords", response_model=Union[BatchKeywordsResponse, BatchTopKResponse])
+async def batch_extract_keywords(
+    input_data: BatchTextInput,
+    max_features: Optional[int] = None,
+    mode: Literal['dense', 'topk', 'npz'] = 'dense',
+    top_k: int = 10,
+):
     """
     Extract keywords from multiple texts using TF-IDF.
+
+    - dense: shared keyword list and the full document x keyword matrix
+    - topk: the top_k terms and scores of each document, computed on the sparse matrix
+    - npz: the sparse matrix and feature names as a compressed .npz file
+
+    max_features <= 0 keeps the whole vocabulary. It defaults to 10 in dense mode; topk and npz
+    keep the whole vocabulary by default, so each document is ranked on its own terms rather
+    than on the batch-wide top terms.
     """
+    if max_features is None:
+        max_features = 10 if mode == 'dense' else 0
     try:
-        keywords, tfidf_matrix = extract_keywords_tfidf(input_data.texts, max_features)
+        keywords, tfidf_matrix = await run_in_threadpool(fit_tfidf, input_data.texts, max_features)
+        if mode == 'topk':
+            documents = await run_in_threadpool(top_k_per_row, keywords, tfidf_matrix, max(top_k, 1))
+            return BatchTopKResponse(documents=documents)
+        if mode == 'npz':
+            content = await run_in_threadpool(csr_to_npz, keywords, tfidf_matrix)
+            return Response(
+                content=content,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": 'attachment; filename="tfidf.npz"'}
+            )
         return BatchKeywordsResponse(
             keywords=keywords.tolist(),
-            tfidf_matrix=tfidf_matrix.tolist()
+            tfidf_matrix=tfidf_matrix.toarray().tolist()
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/batching/stats")
+async def batching_stats():
+    """
+    Micro-batching statistics of single-text requests.
+    """
+    return {"keywords": keyword_batcher.stats(), "segment": segment_batcher.stats()}
+
+@app.get("/api/v1/keyword-model")
+async def keyword_model_stats():
+    """
+    Show the loaded corpus IDF model.
+    """
+    return corpus_model.stats()
+
+@app.post("/api/v1/keyword-model/documents")
+async def update_keyword_model(input_data: CorpusUpdateInput):
+    """
+    Add reviews to the corpus IDF model; with save=true the model is written back to disk.
+    """
+    try:
+        added = await run_in_threadpool(corpus_model.update, input_data.texts)
+        if input_data.save:
+            corpus_model.save()
+        return {"added": added, **corpus_model.stats()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,128 @@
+"""
+NLTK resource manager.
+
+Loads the bundled NLTK corpora from a local directory once at startup,
+keeps the stopword set, lemmatizer and POS tagger in memory, and fails fast
+when a resource is missing instead of downloading it on every boot.
+
+    python nltk_resources.py download   # fetch resources into NLTK_DATA (used by the Dockerfile)
+    python nltk_resources.py check      # verify that every resource can be loaded
+"""
+import os
+import sys
+import time
+from typing import FrozenSet, List, Optional, Tuple
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tag.perceptron import PerceptronTagger
+from nltk.tokenize import word_tokenize
+
+NLTK_DATA_DIR = os.environ.get(
+    'NLTK_DATA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+)
+
+# NLTK 3.9 renamed the pickled punkt and tagger resources
+_NEW_RESOURCE_NAMES = tuple(int(part) for part in nltk.__version__.split('.')[:2]) >= (3, 9)
+
+# (download name, path checked with nltk.data.find)
+REQUIRED_RESOURCES: List[Tuple[str, str]] = [
+    ('punkt_tab', 'tokenizers/punkt_tab') if _NEW_RESOURCE_NAMES else ('punkt', 'tokenizers/punkt'),
+    ('stopwords', 'corpora/stopwords'),
+    ('averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger_eng')
+    if _NEW_RESOURCE_NAMES else ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger'),
+    ('wordnet', 'corpora/wordnet'),
+    ('omw-1.4', 'corpora/omw-1.4'),
+]
+
+
+class MissingResourceError(RuntimeError):
+    pass
+
+
+def _use_local_data():
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+
+def missing_resources() -> List[str]:
+    _use_local_data()
+    missing = []
+    for name, path in REQUIRED_RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+class NLTKResources:
+    def __init__(self):
+        self._stop_words: Optional[FrozenSet[str]] = None
+        self._lemmatizer: Optional[WordNetLemmatizer] = None
+        self._tagger: Optional[PerceptronTagger] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._tagger is not None
+
+    def load(self):
+        """Load and pre-warm every resource; raises MissingResourceError if any is unavailable."""
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        missing = missing_resources()
+        if missing:
+            raise MissingResourceError(
+                f"Missing NLTK resources {missing} in {NLTK_DATA_DIR}. "
+                f"Run `python nltk_resources.py download` or set NLTK_DATA."
+            )
+
+        self._stop_words = frozenset(stopwords.words('english'))
+        lemmatizer = WordNetLemmatizer()
+        # WordNet is loaded lazily on first use, so lemmatize once here
+        lemmatizer.lemmatize('reviews')
+        self._lemmatizer = lemmatizer
+        tagger = PerceptronTagger()
+        # Loads the punkt model into NLTK's cache and runs the tagger once
+        tagger.tag(word_tokenize("The app loads quickly."))
+        self._tagger = tagger
+        self.load_seconds = time.perf_counter() - started
+
+    def _require(self, value):
+        if value is None:
+            raise MissingResourceError("NLTK resources are not loaded; call resources.load() at startup")
+        return value
+
+    @property
+    def stop_words(self) -> FrozenSet[str]:
+        return self._require(self._stop_words)
+
+    @property
+    def lemmatizer(self) -> WordNetLemmatizer:
+        return self._require(self._lemmatizer)
+
+    @property
+    def tagger(self) -> PerceptronTagger:
+        return self._require(self._tagger)
+
+
+resources = NLTKResources()
+
+
+def download(download_dir: str = NLTK_DATA_DIR):
+    for name, _ in REQUIRED_RESOURCES:
+        if not nltk.download(name, download_dir=download_dir, quiet=True, raise_on_error=True):
+            raise MissingResourceError(f"Failed to download NLTK resource {name}")
+    print(f"Downloaded {[name for name, _ in REQUIRED_RESOURCES]} into {download_dir}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command == 'download':
+        download()
+    else:
+        resources.load()
+        print(f"All NLTK resources loaded from {NLTK_DATA_DIR} in {resources.load_seconds:.2f}s")
@@ -0,0 +1,84 @@
+"""
+Batch tokenization, lemmatization and POS tagging for English reviews.
+
+A batch is tokenized in one pass, tagged with a single tag_sents call and
+lemmatized through a per-token cache. Large batches are split across a
+process pool whose workers load the NLTK resources once.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from nltk.tokenize import word_tokenize
+
+from nltk_resources import resources
+
+SEGMENT_WORKERS = int(os.environ.get('SEGMENT_WORKERS', os.cpu_count() or 1))
+# Batches smaller than this are processed in the current process
+PARALLEL_BATCH_SIZE = int(os.environ.get('PARALLEL_BATCH_SIZE', 200))
+LEMMA_CACHE_SIZE = int(os.environ.get('LEMMA_CACHE_SIZE', 100000))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token: str) -> str:
+    return resources.lemmatizer.lemmatize(token)
+
+
+def filter_tokens(text: str) -> List[str]:
+    """Tokenize and drop stopwords and non-alphabetic tokens."""
+    stop_words = resources.stop_words
+    filtered = []
+    for token in word_tokenize(text):
+        lowered = token.lower()
+        if lowered not in stop_words and token.isalpha():
+            filtered.append(lowered)
+    return filtered
+
+
+def process_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """Segment a list of texts; the result for each text matches the single-text endpoint."""
+    token_lists = [filter_tokens(text) for text in texts]
+    tagged = resources.tagger.tag_sents(token_lists)
+    return [
+        {
+            'tokens': tokens,
+            'lemmas': [lemmatize(token) for token in tokens],
+            'pos_tags': pos_tags,
+        }
+        for tokens, pos_tags in zip(token_lists, tagged)
+    ]
+
+
+def _ready() -> bool:
+    return True
+
+
+def start():
+    """Start and warm the process pool; workers inherit or load the NLTK resources."""
+    global _pool
+    if SEGMENT_WORKERS > 1 and _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=SEGMENT_WORKERS, initializer=resources.load)
+        for future in [_pool.submit(_ready) for _ in range(SEGMENT_WORKERS)]:
+            future.result()
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def process_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """Process small batches inline and split large ones into one chunk per worker call."""
+    if _pool is None or len(texts) < PARALLEL_BATCH_SIZE:
+        return process_texts(texts)
+    chunk_size = max(1, -(-len(texts) // (SEGMENT_WORKERS * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    results: List[Dict[str, Any]] = []
+    for chunk_result in _pool.map(process_texts, chunks):
+        results.extend(chunk_result)
+    return results
@@ -33,6 +33,17 @@ def test_api():
     )
     print("Batch Keywords Response:", json.dumps(batch_response.json(), indent=2))
 
+def test_batch_topk_keeps_document_terms():
+    # Runs offline: calls the endpoint function directly instead of a running server
+    import asyncio
+    from main import BatchTextInput, batch_extract_keywords
+
+    texts = ["login crashes screen freezes after update and sync fails"] * 5 + ["refund please"]
+    response = asyncio.run(batch_extract_keywords(BatchTextInput(texts=texts), mode='topk', top_k=3))
+    # "refund" is outside the batch-wide top 10 terms but is the last review's own keyword
+    assert "refund" in response.documents[-1].keywords
+    assert all(response.documents[i].keywords for i in range(len(texts)))
+
 if __name__ == "__main__":
     try:
         test_api()
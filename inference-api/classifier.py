@@ -0,0 +1,140 @@
+"""
+評論情感與分類模型
+
+啟動時在 CPU 上載入一次 Hugging Face 的 BERT 分類模型，可選擇 PyTorch
+或由 export_onnx.py 匯出（並量化為 int8）的 ONNX 模型。
+輸出格式與 Hugging Face Inference API 相同：每則文本一組依分數排序的 {label, score}。
+"""
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from transformers import AutoConfig, AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = os.environ.get('SENTIMENT_MODEL', 'jackietung/bert-base-chinese-finetuned-sentiment')
+CATEGORY_MODEL = os.environ.get('CATEGORY_MODEL', 'jackietung/bert-base-chinese-finetuned-multi-classification')
+# torch 或 onnx
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+# export_onnx.py 的輸出目錄，每個模型一個子目錄
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+# 使用 int8 量化的 ONNX 模型
+ONNX_QUANTIZED = os.environ.get('ONNX_QUANTIZED', '1') == '1'
+MAX_SEQ_LENGTH = int(os.environ.get('MAX_SEQ_LENGTH', 512))
+# 每個模型的推論執行緒數，0 表示使用函式庫預設值
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', 0))
+
+MODELS = {
+    'sentiment': SENTIMENT_MODEL,
+    'category': CATEGORY_MODEL,
+}
+
+ONNX_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model.int8.onnx'
+
+
+def onnx_path(name: str, quantized: bool = ONNX_QUANTIZED) -> str:
+    return os.path.join(ONNX_MODEL_DIR, name, ONNX_INT8_FILE if quantized else ONNX_FILE)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+def sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-logits))
+
+
+class TextClassifier:
+    def __init__(self, name: str, model_id: str, backend: str = INFERENCE_BACKEND):
+        self.name = name
+        self.model_id = model_id
+        self.backend = backend
+        self.labels: List[str] = []
+        self.multi_label = False
+        self.load_seconds: Optional[float] = None
+        self._tokenizer = None
+        self._model = None
+        self._session = None
+        self._input_names: List[str] = []
+
+    def load(self):
+        started = time.perf_counter()
+        if self.backend == 'onnx':
+            self._load_onnx()
+        else:
+            self._load_torch()
+        # 與 transformers 的 pipeline 相同：多標籤模型使用 sigmoid，其餘使用 softmax
+        self.multi_label = self._config.problem_type == 'multi_label_classification'
+        self.labels = [self._config.id2label[i] for i in range(len(self._config.id2label))]
+        # 先推論一次，讓第一個請求不必等待記憶體配置與執行緒啟動
+        self.predict(["預熱"])
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"{self.name} 模型載入完成 ({self.backend}, {self.load_seconds:.2f}s)")
+
+    def _load_torch(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        if INFERENCE_THREADS > 0:
+            torch.set_num_threads(INFERENCE_THREADS)
+        self._config = AutoConfig.from_pretrained(self.model_id)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self._model = AutoModelForSequenceClassification.from_pretrained(self.model_id).eval()
+
+    def _load_onnx(self):
+        import onnxruntime
+
+        path = onnx_path(self.name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} 不存在，請先執行 python export_onnx.py")
+        directory = os.path.dirname(path)
+        # 匯出時一併儲存了設定檔與 tokenizer，不需要 PyTorch
+        self._config = AutoConfig.from_pretrained(directory)
+        self._tokenizer = AutoTokenizer.from_pretrained(directory)
+        options = onnxruntime.SessionOptions()
+        if INFERENCE_THREADS > 0:
+            options.intra_op_num_threads = INFERENCE_THREADS
+        self._session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self._input_names = [item.name for item in self._session.get_inputs()]
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        if self._session is not None:
+            encoded = self._tokenizer(
+                texts, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors='np'
+            )
+            inputs = {name: encoded[name].astype(np.int64) for name in self._input_names}
+            return self._session.run(None, inputs)[0]
+
+        import torch
+        encoded = self._tokenizer(
+            texts, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors='pt'
+        )
+        with torch.inference_mode():
+            return self._model(**encoded).logits.float().numpy()
+
+    def predict(self, texts: List[str]) -> List[List[Dict]]:
+        """每則文本所有標籤的分數，由高到低排序"""
+        if not texts:
+            return []
+        logits = self.logits(texts)
+        scores = sigmoid(logits) if self.multi_label else softmax(logits)
+        results = []
+        for row in scores:
+            order = np.argsort(-row, kind='stable')
+            results.append([{"label": self.labels[i], "score": float(row[i])} for i in order])
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_id,
+            "backend": self.backend,
+            "path": onnx_path(self.name) if self.backend == 'onnx' else None,
+            "labels": self.labels,
+            "multi_label": self.multi_label,
+            "load_seconds": self.load_seconds,
+        }
@@ -0,0 +1,87 @@
+"""
+把情感與分類模型匯出為 ONNX，並以動態量化產生 int8 版本
+
+    python export_onnx.py                 # 匯出兩個模型到 ONNX_MODEL_DIR
+    python export_onnx.py sentiment       # 只匯出情感模型
+    python export_onnx.py --no-quantize   # 只匯出 float32 模型
+
+匯出後以 INFERENCE_BACKEND=onnx 啟動服務（ONNX_QUANTIZED=0 時使用 float32 模型）。
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from classifier import MODELS, ONNX_FILE, ONNX_INT8_FILE, ONNX_MODEL_DIR
+
+OPSET_VERSION = 14
+SAMPLE_TEXTS = ["這個 APP 很好用", "登入常常失敗，客服也沒有回覆，希望盡快修正"]
+
+
+def export(name: str, model_id: str, output_dir: str, quantize: bool = True):
+    directory = os.path.join(output_dir, name)
+    os.makedirs(directory, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForSequenceClassification.from_pretrained(model_id).eval()
+    # 設定檔與 tokenizer 一併儲存，ONNX 模式啟動時不需要 PyTorch
+    tokenizer.save_pretrained(directory)
+    model.config.save_pretrained(directory)
+
+    encoded = tokenizer(SAMPLE_TEXTS, padding=True, return_tensors='pt')
+    input_names = [key for key in ('input_ids', 'attention_mask', 'token_type_ids') if key in encoded]
+    path = os.path.join(directory, ONNX_FILE)
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(encoded[key] for key in input_names),
+            path,
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes={
+                **{key: {0: 'batch', 1: 'sequence'} for key in input_names},
+                'logits': {0: 'batch'},
+            },
+            opset_version=OPSET_VERSION,
+        )
+        expected = model(**encoded).logits.numpy()
+    check(path, encoded, input_names, expected)
+    print(f"{name}: {path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(directory, ONNX_INT8_FILE)
+        quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+        check(quantized_path, encoded, input_names, expected)
+        print(f"{name}: {quantized_path}")
+
+
+def check(path: str, encoded, input_names, expected: np.ndarray):
+    """以匯出時的範例文本比對 ONNX 與 PyTorch 的預測標籤"""
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+    logits = session.run(None, {key: encoded[key].numpy() for key in input_names})[0]
+    if not np.array_equal(logits.argmax(axis=-1), expected.argmax(axis=-1)):
+        raise RuntimeError(f"{path} 的預測與 PyTorch 模型不同")
+    print(f"  最大 logit 誤差 {np.abs(logits - expected).max():.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the review classifiers to ONNX")
+    parser.add_argument('models', nargs='*', help=f'models to export: {", ".join(sorted(MODELS))} (default: all)')
+    parser.add_argument('--output-dir', default=ONNX_MODEL_DIR)
+    parser.add_argument('--no-quantize', action='store_true', help='skip the int8 model')
+    args = parser.parse_args()
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+
+    for name in args.models or sorted(MODELS):
+        export(name, MODELS[name], args.output_dir, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
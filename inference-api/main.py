@@ -0,0 +1,110 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+import asyncio
+import logging
+import os
+from classifier import MODELS, TextClassifier
+from micro_batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXTS = int(os.environ.get('INFERENCE_MAX_TEXTS', 5000))
+# 並行請求的文本在 MAX_BATCH_WAIT_MS 毫秒內（最多 MAX_BATCH_SIZE 筆）合併成一批推論
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 32))
+MAX_BATCH_WAIT_MS = float(os.environ.get('MAX_BATCH_WAIT_MS', 5))
+
+Task = Literal['sentiment', 'category']
+
+# 數據模型
+class ClassifyRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_TEXTS)
+    tasks: List[Task] = ['sentiment', 'category']
+    # 每個任務回傳的標籤數，未設定時回傳所有標籤
+    top_k: Optional[int] = Field(None, ge=1)
+
+class LabelScore(BaseModel):
+    label: str
+    score: float
+
+class ClassifyResult(BaseModel):
+    # 依分數由高到低排序，與 Hugging Face Inference API 的結果相同
+    sentiment: Optional[List[LabelScore]] = None
+    category: Optional[List[LabelScore]] = None
+
+classifiers: Dict[str, TextClassifier] = {name: TextClassifier(name, model_id) for name, model_id in MODELS.items()}
+# 每個模型只用一個執行緒推論，模型本身會使用多執行緒運算
+batchers: Dict[str, MicroBatcher] = {
+    name: MicroBatcher(classifier.predict, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS, dedicated_thread=True)
+    for name, classifier in classifiers.items()
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 啟動時載入模型一次，之後所有請求共用
+    for classifier in classifiers.values():
+        await run_in_threadpool(classifier.load)
+    for batcher in batchers.values():
+        batcher.start()
+    yield
+    for batcher in batchers.values():
+        await batcher.stop()
+
+app = FastAPI(
+    title="Review Inference API",
+    description="Sentiment and category classification of reviews with dynamically batched local models",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# 配置 CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # 在生產環境中應該設置具體的域名
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.post("/api/v1/classify", response_model=List[ClassifyResult])
+async def classify(request: ClassifyRequest):
+    """批次情感與分類分析；並行請求的文本會合併成同一批推論，長度相近的文本放在同一批以減少 padding"""
+    tasks = list(dict.fromkeys(request.tasks))
+    try:
+        outputs = await asyncio.gather(*(batchers[task].submit_many(request.texts, sort_key=len) for task in tasks))
+    except Exception as e:
+        logger.error(f"推論失敗: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    results = [{} for _ in request.texts]
+    for task, output in zip(tasks, outputs):
+        for result, scores in zip(results, output):
+            result[task] = scores[:request.top_k]
+    return results
+
+@app.get("/api/v1/models")
+async def model_stats():
+    """模型與動態批次的統計"""
+    return {
+        name: {**classifiers[name].stats(), "batching": batchers[name].stats()}
+        for name in classifiers
+    }
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/")
+async def root():
+    return {
+        "message": "Welcome to Review Inference API",
+        "docs_url": "/docs",
+        "redoc_url": "/redoc"
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.environ.get("PORT", 8000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,131 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import pipelines
+from pipelines import GATEWAY_MAX_TEXTS, chinese_service, english_service
+
+# 數據模型
+class BatchRequest(BaseModel):
+    texts: List[str]
+    # 每則文本的語言標記（zh、en、zh-TW、中文…），未提供或無法辨識時自動判斷
+    languages: Optional[List[Optional[str]]] = None
+    top_n: Optional[int] = 10
+
+class KeywordResult(BaseModel):
+    language: str
+    keywords: List[str]
+    scores: List[float]
+    error: Optional[str] = None
+
+class SegmentResult(BaseModel):
+    language: str
+    tokens: List[str]
+    # 只有英文有詞形還原與詞性標記
+    lemmas: Optional[List[str]] = None
+    pos_tags: Optional[List[Tuple[str, str]]] = None
+    error: Optional[str] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 沿用兩個服務各自的啟動流程：字典、行程池、NLTK 資源、IDF 模型與結果快取
+    async with chinese_service.lifespan(app):
+        await english_service.startup_event()
+        try:
+            yield
+        finally:
+            await english_service.shutdown_event()
+
+app = FastAPI(
+    title="NLP Gateway",
+    description="Routes mixed Chinese and English batches to the jieba and NLTK pipelines in one process",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# 配置 CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # 在生產環境中應該設置具體的域名
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+def validate(request: BatchRequest):
+    if len(request.texts) > GATEWAY_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {GATEWAY_MAX_TEXTS} texts per request")
+    if request.languages is not None and len(request.languages) != len(request.texts):
+        raise HTTPException(status_code=400, detail="languages must have the same length as texts")
+
+async def run_routed(
+    request: BatchRequest,
+    handlers: Dict[str, Callable[[List[str]], List[Dict[str, Any]]]],
+) -> List[Dict[str, Any]]:
+    """依語言分組，兩組同時在執行緒中整批處理，再依原本順序合併"""
+    languages = pipelines.route(request.texts, request.languages)
+    groups = {
+        language: indices
+        for language, indices in pipelines.group_by_language(languages).items()
+        if indices
+    }
+    outputs = await asyncio.gather(*(
+        run_in_threadpool(handlers[language], [request.texts[i] for i in indices])
+        for language, indices in groups.items()
+    ))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(request.texts)
+    for (language, indices), output in zip(groups.items(), outputs):
+        for i, result in zip(indices, output):
+            results[i] = {"language": language, **result}
+    return results
+
+@app.post("/api/v1/keywords", response_model=List[KeywordResult])
+async def batch_keywords(request: BatchRequest):
+    """中英文混合的批次關鍵詞提取，每則結果與對應語言服務的 /api/v1/keywords 相同"""
+    validate(request)
+    try:
+        return await run_routed(request, {
+            'zh': lambda texts: pipelines.chinese_keywords(texts, request.top_n),
+            'en': lambda texts: pipelines.english_keywords(texts, request.top_n),
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/segment", response_model=List[SegmentResult])
+async def batch_segment(request: BatchRequest):
+    """中英文混合的批次分詞"""
+    validate(request)
+    try:
+        return await run_routed(request, {
+            'zh': pipelines.chinese_segments,
+            'en': pipelines.english_segments,
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/detect-language", response_model=List[str])
+async def detect_language(request: BatchRequest):
+    """只回傳每則文本會被送往的語言"""
+    validate(request)
+    return pipelines.route(request.texts, request.languages)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/")
+async def root():
+    return {
+        "message": "Welcome to NLP Gateway",
+        "docs_url": "/docs",
+        "redoc_url": "/redoc"
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.environ.get("PORT", 8000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
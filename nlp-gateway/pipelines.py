@@ -0,0 +1,172 @@
+"""
+中英文處理流程
+
+在同一個行程中載入 chinese-nlp-api 與 english-nlp-api，依語言把文本分組後
+整批交給 jieba 或 NLTK 處理，再依原本順序合併成統一格式的結果。
+兩個服務的 main.py 以別名載入，其他模組放在同一個 sys.path 中，
+因此啟動時會先確認兩個服務與閘道的模組名稱沒有重複。
+"""
+import importlib.util
+import os
+import re
+import sys
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+GATEWAY_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(GATEWAY_DIR)
+CHINESE_NLP_DIR = os.environ.get('CHINESE_NLP_DIR', os.path.join(BASE_DIR, 'chinese-nlp-api'))
+ENGLISH_NLP_DIR = os.environ.get('ENGLISH_NLP_DIR', os.path.join(BASE_DIR, 'english-nlp-api'))
+# 兩個服務共用的模組（micro_batcher）
+COMMON_DIR = os.environ.get('NLP_COMMON_DIR', os.path.join(BASE_DIR, 'common'))
+
+# 兩個服務都讀取 SEGMENT_WORKERS，在閘道中分開設定，預設各使用一半的 CPU
+_DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+CHINESE_SEGMENT_WORKERS = int(os.environ.get('CHINESE_SEGMENT_WORKERS', _DEFAULT_WORKERS))
+ENGLISH_SEGMENT_WORKERS = int(os.environ.get('ENGLISH_SEGMENT_WORKERS', _DEFAULT_WORKERS))
+GATEWAY_MAX_TEXTS = int(os.environ.get('GATEWAY_MAX_TEXTS', 10000))
+
+LANGUAGES = ('zh', 'en')
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+LATIN_WORD_PATTERN = re.compile(r'[A-Za-z]+')
+
+
+def _module_names(directory: str) -> Set[str]:
+    """目錄最上層的模組與套件名稱；main.py 以別名載入，不會互相衝突"""
+    names = set()
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if entry.endswith('.py'):
+            names.add(entry[:-3])
+        elif os.path.isfile(os.path.join(path, '__init__.py')):
+            names.add(entry)
+    return names - {'main'}
+
+
+def check_module_names(*directories: str):
+    """同名模組只會載入第一個目錄中的版本，另一個服務會在不知情的情況下使用錯誤的模組"""
+    seen: Dict[str, str] = {}
+    conflicts = []
+    for directory in directories:
+        for name in sorted(_module_names(directory)):
+            if name in seen:
+                conflicts.append(f"{name} ({seen[name]}, {directory})")
+            else:
+                seen[name] = directory
+    if conflicts:
+        raise RuntimeError(f"服務之間的模組名稱重複，請重新命名: {', '.join(conflicts)}")
+
+
+def _load_service(alias: str, directory: str) -> ModuleType:
+    """以別名載入服務的 main.py，避免和閘道自己的 main 模組衝突"""
+    # 加在 sys.path 最後，閘道自己的 main 與 pipelines 不會被服務的同名模組取代
+    if directory not in sys.path:
+        sys.path.append(directory)
+    spec = importlib.util.spec_from_file_location(alias, os.path.join(directory, 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[alias] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+check_module_names(GATEWAY_DIR, COMMON_DIR, CHINESE_NLP_DIR, ENGLISH_NLP_DIR)
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+chinese_service = _load_service('chinese_nlp_main', CHINESE_NLP_DIR)
+english_service = _load_service('english_nlp_main', ENGLISH_NLP_DIR)
+
+# 兩個服務的模組已在載入 main.py 時匯入
+import nlp  # noqa: E402
+import review_tokenizer  # noqa: E402
+import segmenter  # noqa: E402
+
+segmenter.SEGMENT_WORKERS = CHINESE_SEGMENT_WORKERS
+review_tokenizer.SEGMENT_WORKERS = ENGLISH_SEGMENT_WORKERS
+
+
+def detect_language(text: str) -> str:
+    """中文約兩字一詞，估計的中文詞數不少於英文單字數時視為中文"""
+    cjk_chars = len(CJK_PATTERN.findall(text))
+    if not cjk_chars:
+        return 'en'
+    latin_words = len(LATIN_WORD_PATTERN.findall(text))
+    return 'zh' if cjk_chars >= 2 * latin_words else 'en'
+
+
+def normalize_language(hint: Optional[str]) -> Optional[str]:
+    """接受 zh、zh-TW、en-US、中文、英文 等標記，無法辨識時回傳 None（自動判斷）"""
+    if not hint:
+        return None
+    hint = hint.strip().lower()
+    if hint.startswith('zh') or '中' in hint:
+        return 'zh'
+    if hint.startswith('en') or '英' in hint:
+        return 'en'
+    return None
+
+
+def route(texts: Sequence[str], hints: Optional[Sequence[Optional[str]]] = None) -> List[str]:
+    hints = hints or [None] * len(texts)
+    return [normalize_language(hint) or detect_language(text) for text, hint in zip(texts, hints)]
+
+
+def group_by_language(languages: Sequence[str]) -> Dict[str, List[int]]:
+    groups: Dict[str, List[int]] = {language: [] for language in LANGUAGES}
+    for i, language in enumerate(languages):
+        groups[language].append(i)
+    return groups
+
+
+def _empty_keywords(error: Optional[str] = None) -> Dict[str, Any]:
+    return {'keywords': [], 'scores': [], 'error': error}
+
+
+def chinese_keywords(texts: List[str], top_n: Optional[int]) -> List[Dict[str, Any]]:
+    """與 /api/v1/keywords 相同的結果；快取未命中的文本整批清理與分詞"""
+    items = [(text, top_n, nlp.keyword_cache_key(text, top_n)) for text in texts]
+    results = []
+    for value in nlp.extract_keywords_batch(items):
+        if isinstance(value, Exception):
+            results.append(_empty_keywords(getattr(value, 'detail', None) or str(value)))
+        else:
+            results.append({
+                'keywords': value['keywords'],
+                'scores': [item['score'] for item in value['word_scores']],
+                'error': None,
+            })
+    return results
+
+
+def english_keywords(texts: List[str], top_n: Optional[int]) -> List[Dict[str, Any]]:
+    """與 /api/v1/keywords 相同：有語料庫模型時以語料庫 IDF 計分，否則逐則建立 TF-IDF"""
+    max_features = top_n if top_n is not None else 0
+    corpus_model = english_service.corpus_model
+    results = []
+    for text in texts:
+        try:
+            if corpus_model.loaded:
+                keywords, scores = corpus_model.keywords(text, max_features if max_features > 0 else None)
+            else:
+                feature_names, tfidf = english_service.fit_tfidf([text], max_features)
+                keywords, scores = feature_names.tolist(), tfidf.toarray()[0].tolist()
+            results.append({'keywords': keywords, 'scores': scores, 'error': None})
+        except Exception as e:
+            # 與中文相同，單則評論失敗只影響自己的結果
+            results.append(_empty_keywords(str(e)))
+    return results
+
+
+def chinese_segments(texts: List[str]) -> List[Dict[str, Any]]:
+    cleaned = nlp.clean_texts(texts)
+    to_segment = [i for i, text in enumerate(cleaned) if text]
+    results = [
+        {'tokens': [], 'lemmas': None, 'pos_tags': None, 'error': "Text is empty after cleaning"}
+        for _ in texts
+    ]
+    for i, words in zip(to_segment, segmenter.segment_texts([cleaned[i] for i in to_segment])):
+        results[i] = {'tokens': words, 'lemmas': None, 'pos_tags': None, 'error': None}
+    return results
+
+
+def english_segments(texts: List[str]) -> List[Dict[str, Any]]:
+    return [{**result, 'error': None} for result in review_tokenizer.process_batch(texts)]
@@ -1,8 +1,15 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import router
+from routes import router, search_manager
 
-app = FastAPI(title="App Store Search API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await search_manager.start()
+    yield
+    await search_manager.close()
+
+app = FastAPI(title="App Store Search API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -5,6 +5,9 @@ import asyncio
 
 router = APIRouter()
 
+# 所有請求共用同一個 AppSearchManager，session 由 main.py 的 lifespan 管理
+search_manager = AppSearchManager()
+
 class SearchRequest(BaseModel):
     searchTerm: str
 
@@ -14,7 +17,6 @@ async def search_apps(request: SearchRequest):
         if not request.searchTerm:
             raise HTTPException(status_code=400, detail="搜尋詞不能為空")
 
-        search_manager = AppSearchManager()
         results = await search_manager.search_all_platforms([request.searchTerm])
         
         return {"data": results}
@@ -1,13 +1,24 @@
 import aiohttp
-from bs4 import BeautifulSoup
 from typing import Dict, Optional, List
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import logging
+import os
+from parsers import parse_apple_search, parse_google_search, run_parser
+from ranking import MAX_CANDIDATES, rank_candidates
 import asyncio
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 共用連線池設定
+CONNECTION_LIMIT = int(os.environ.get('SEARCH_CONNECTION_LIMIT', 100))
+CONNECTION_LIMIT_PER_HOST = int(os.environ.get('SEARCH_CONNECTION_LIMIT_PER_HOST', 20))
+DNS_CACHE_TTL = int(os.environ.get('SEARCH_DNS_CACHE_TTL', 300))
+KEEPALIVE_TIMEOUT = float(os.environ.get('SEARCH_KEEPALIVE_TIMEOUT', 60))
+REQUEST_TIMEOUT = float(os.environ.get('SEARCH_REQUEST_TIMEOUT', 15))
+# 同時進行 Apple → Google 搜尋鏈的搜尋詞數量上限
+SEARCH_CONCURRENCY = int(os.environ.get('SEARCH_CONCURRENCY', 8))
+
 @dataclass
 class AppInfo:
     name: Optional[str] = None
@@ -15,12 +26,49 @@ class AppInfo:
     platform: str = ""
     search_term: str = ""
     found: bool = False  # 添加標記來追蹤搜尋狀態
+    # 同一個搜尋頁面中依相似度排序的候選應用，第一個即為 name / link
+    candidates: List[Dict] = field(default_factory=list)
 
 class AppSearchManager:
     def __init__(self):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+    async def start(self):
+        """建立在應用程式生命週期內共用的 session"""
+        if self.session is None or self.session.closed:
+            self.session = self.create_session()
+            logger.info("AppSearchManager session 已建立")
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logger.info("AppSearchManager session 已關閉")
+        self.session = None
+
+    def apply_candidates(self, app_info: AppInfo, candidates: List, require_link: bool):
+        app_info.candidates = rank_candidates(app_info.search_term, candidates)
+        if app_info.candidates:
+            best = app_info.candidates[0]
+            app_info.name = best["name"]
+            app_info.link = best["link"]
+            # Google Play 需要有詳細頁連結才算找到
+            app_info.found = bool(best["link"]) if require_link else True
 
     async def search_apple_store(self, session: aiohttp.ClientSession, search_term: str) -> AppInfo:
         base_url = f"https://www.apple.com/tw/search/{search_term}?src=serp"
@@ -30,14 +78,8 @@ class AppSearchManager:
             async with session.get(base_url, headers=self.headers) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    if product_block := soup.find('div', class_='rf-serp-product-description'):
-                        if name_tag := product_block.find('h2', class_='rf-serp-productname'):
-                            app_info.name = name_tag.get_text(strip=True)
-                            app_info.found = True
-                        if link_tag := product_block.find('a', href=True):
-                            app_info.link = link_tag['href']
+                    candidates = await run_parser(parse_apple_search, html, MAX_CANDIDATES)
+                    self.apply_candidates(app_info, candidates, require_link=False)
                 else:
                     logger.warning(f"Apple Store returned status {response.status} for term '{search_term}'")
         except Exception as e:
@@ -53,15 +95,8 @@ class AppSearchManager:
             async with session.get(base_url, headers=self.headers) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    if name_div := soup.select_one('div.vWM94c'):
-                        app_name = name_div.text.strip()
-                        if app_name:
-                            app_info.name = app_name
-                            if link_element := soup.select_one('a[href*="/store/apps/details"]'):
-                                app_info.link = f"https://play.google.com{link_element['href']}&hl=zh_TW"
-                                app_info.found = True
+                    candidates = await run_parser(parse_google_search, html, MAX_CANDIDATES)
+                    self.apply_candidates(app_info, candidates, require_link=True)
                 else:
                     logger.warning(f"Google Play returned status {response.status} for term '{search_term}'")
         except Exception as e:
@@ -72,18 +107,36 @@ class AppSearchManager:
     async def search_all_platforms(self, search_terms: List[str]) -> List[Dict]:
         results = []
         try:
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for term in search_terms:
-                    # 首先搜尋 Apple Store
-                    apple_result = await self.search_apple_store(session, term)
-                    results.append(asdict(apple_result))
-                    
-                    # 使用 Apple Store 的結果來搜尋 Google Play
-                    search_term_for_google = apple_result.name if apple_result.found else term
-                    google_result = await self.search_google_play(session, search_term_for_google)
-                    results.append(asdict(google_result))
+            if self.session is None or self.session.closed:
+                # 未呼叫 start() 時（例如單獨使用此類別），使用一次性的 session
+                async with self.create_session() as session:
+                    await self._search_all_platforms(session, search_terms, results)
+            else:
+                await self._search_all_platforms(self.session, search_terms, results)
         except Exception as e:
             logger.error(f"Error in search_all_platforms: {e}")
-        
-        return results
\ No newline at end of file
+
+        return results
+
+    async def _search_term(self, session: aiohttp.ClientSession, term: str, semaphore: asyncio.Semaphore) -> List[Dict]:
+        async with semaphore:
+            # 首先搜尋 Apple Store
+            apple_result = await self.search_apple_store(session, term)
+
+            # 使用 Apple Store 的結果來搜尋 Google Play
+            search_term_for_google = apple_result.name if apple_result.found else term
+            google_result = await self.search_google_play(session, search_term_for_google)
+        return [asdict(apple_result), asdict(google_result)]
+
+    async def _search_all_platforms(self, session: aiohttp.ClientSession, search_terms: List[str], results: List[Dict]):
+        # 每個搜尋詞的 Apple → Google 搜尋鏈各自獨立執行，結果依搜尋詞原本的順序排列
+        semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+        chains = await asyncio.gather(
+            *(self._search_term(session, term, semaphore) for term in search_terms),
+            return_exceptions=True
+        )
+        for term, chain in zip(search_terms, chains):
+            if isinstance(chain, Exception):
+                logger.error(f"Search chain error for term '{term}': {chain}")
+                continue
+            results.extend(chain)
\ No newline at end of file